@@ -1,15 +1,28 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List, Callable, TypeVar, Generic, Type, Union
 from dataclasses import dataclass
-from datetime import datetime
-import json
+from datetime import datetime, timezone
+import itertools
+import orjson
+import sys
+import time
 import uuid
 import logging
 from pathlib import Path
 T = TypeVar('T')
 from core.mcp import Message, MessageType
 MessageHandler = Callable[[Message], Any]
-@dataclass
+_MESSAGE_TYPE_INDEX = {mt.value: i for i, mt in enumerate(MessageType)}
+_STR_TO_ENUM = {mt.value: mt for mt in MessageType}
+_TS_CACHE = ['', 0]
+def _cached_utc_timestamp() -> str:
+    """Return an ISO UTC timestamp, reformatted at most once per millisecond."""
+    now = time.time_ns()
+    if now - _TS_CACHE[1] > 1_000_000:
+        _TS_CACHE[0] = datetime.now(timezone.utc).isoformat()
+        _TS_CACHE[1] = now
+    return _TS_CACHE[0]
+@dataclass(slots=True)
 class MCPMessage:
     """Model Context Protocol message format."""
     sender: str
@@ -19,8 +32,10 @@ class MCPMessage:
     payload: Dict[str, Any]
     timestamp: str = None
     def __post_init__(self):
+        if isinstance(self.message_type, str):
+            self.message_type = _STR_TO_ENUM.get(self.message_type) or sys.intern(self.message_type)
         if self.timestamp is None:
-            self.timestamp = datetime.utcnow().isoformat()
+            self.timestamp = _cached_utc_timestamp()
     def to_dict(self) -> Dict[str, Any]:
         """Convert message to dictionary."""
         return {
@@ -31,31 +46,21 @@ class MCPMessage:
             'payload': self.payload,
             'timestamp': self.timestamp
         }
-    def to_json(self) -> str:
+    def to_json(self, pretty: bool = False) -> str:
         """Serialize message to JSON."""
-        return json.dumps(self.to_dict(), indent=2)
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        return orjson.dumps(self.to_dict(), option=option).decode('utf-8')
+    def to_bytes(self) -> bytes:
+        """Serialize message to compact JSON bytes for wire transport."""
+        return orjson.dumps(self.to_dict())
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'MCPMessage':
         """Create message from dictionary."""
         return cls(**data)
     @classmethod
-    def from_json(cls, json_str: str) -> 'MCPMessage':
-        """Create message from JSON string."""
-        return cls.from_dict(json.loads(json_str))
-class MCPClient:
-    """Base MCP client for sending and receiving messages"""
-    def __init__(self):
-        self.message_handlers = {}
-    def register_handler(self, message_type: str, handler):
-        """Register a handler for a specific message type"""
-        self.message_handlers[message_type] = handler
-    async def send_message(self, message: MCPMessage) -> None:
-        """Send a message to the appropriate handler"""
-        if message.message_type in self.message_handlers:
-            return await self.message_handlers[message.message_type](message)
-        else:
-            print(f"No handler registered for message type: {message.message_type}")
-            return None
+    def from_json(cls, json_str: Union[str, bytes]) -> 'MCPMessage':
+        """Create message from a JSON string or bytes."""
+        return cls.from_dict(orjson.loads(json_str))
 class BaseAgent(ABC):
     """Base class for all agents in the system."""
     def __init__(self, agent_id: str, mcp_server: Any):
@@ -68,6 +73,8 @@ class BaseAgent(ABC):
         self.agent_id = agent_id
         self.mcp_server = mcp_server
         self._message_handlers = {}
+        self._handler_table = (None,) * len(MessageType)
+        self._trace_counter = itertools.count(time.time_ns() << 20)
         if mcp_server:
             mcp_server.register_client(agent_id, self)
         self.setup_handlers()
@@ -79,6 +86,9 @@ class BaseAgent(ABC):
             handler: The handler function to call when a message of this type is received.
         """
         self._message_handlers[message_type] = handler
+        self._handler_table = tuple(
+            self._message_handlers.get(mt) for mt in MessageType
+        )
     async def handle_message(self, message: Message) -> Optional[Message]:
         """
         Handle an incoming message by dispatching it to the appropriate handler.
@@ -87,10 +97,23 @@ class BaseAgent(ABC):
         Returns:
             Optional response message, if any.
         """
-        handler = self._message_handlers.get(message.message_type)
+        index = _MESSAGE_TYPE_INDEX.get(message.message_type)
+        if index is not None:
+            handler = self._handler_table[index]
+        else:
+            handler = self._message_handlers.get(message.message_type)
         if handler:
             return await handler(message)
         return None
+    async def receive_message(self, message: Message) -> Optional[Message]:
+        """
+        Entry point used by MCPServer routing; delegates to handle_message.
+        Args:
+            message: The incoming message to handle.
+        Returns:
+            Optional response message, if any.
+        """
+        return await self.handle_message(message)
     @abstractmethod
     def setup_handlers(self) -> None:
         """
@@ -105,7 +128,7 @@ class BaseAgent(ABC):
         message_type: Union[MessageType, str], 
         payload: Optional[Dict[str, Any]] = None,
         trace_id: Optional[str] = None
-    ) -> None:
+    ) -> Optional[Message]:
         """
         Send a message to another agent.
         Args:
@@ -113,22 +136,24 @@ class BaseAgent(ABC):
             message_type: Type of the message.
             payload: Optional message payload.
             trace_id: Optional trace ID for request tracking.
+        Returns:
+            The receiving agent's response message, if it produced one.
         """
         if payload is None:
             payload = {}
         if trace_id is None:
-            trace_id = str(uuid.uuid4())
+            trace_id = f"{self.agent_id}-{next(self._trace_counter):x}"
         message = Message(
             sender=self.agent_id,
             receiver=receiver_id,
-            message_type=message_type.value if isinstance(message_type, MessageType) else message_type,
+            message_type=message_type,
             payload=payload,
             trace_id=trace_id
         )
         if self.mcp_server:
-            await self.mcp_server.route_message(message)
-        else:
-            self.logger.warning(f"No MCP server configured, message not sent: {message}")
+            return await self.mcp_server.route_message(message)
+        self.logger.warning(f"No MCP server configured, message not sent: {message}")
+        return None
     async def handle_error(
         self, 
         error: Exception, 
@@ -1,8 +1,12 @@
 from typing import Dict, Any, Optional
-from agents.base_agent import BaseAgent, MCPMessage  
+from agents.base_agent import BaseAgent, MCPMessage
+from core.mcp import Message, MessageType
+import asyncio
 import logging
 class CoordinatorAgent(BaseAgent):
     """Coordinates between different agents in the system"""
+    OUTBOX_BATCH_SIZE = 32
+    OUTBOX_FLUSH_INTERVAL = 0.001
     def __init__(self, mcp_server, agents: Dict[str, Any]):
         """
         Initialize the Coordinator Agent
@@ -13,10 +17,45 @@ class CoordinatorAgent(BaseAgent):
         super().__init__("coordinator_agent", mcp_server)
         self.agents = agents
         self.logger = logging.getLogger(__name__)
-        self.setup_handlers()
+        self._outbox = asyncio.Queue()
+        self._drain_task = None
         self.logger.info("CoordinatorAgent initialized")
+    def enqueue_message(self, message) -> None:
+        """
+        Queue an outbound message for batched routing.
+        Messages are drained in bursts of up to OUTBOX_BATCH_SIZE by a
+        background task, so handlers pay one enqueue instead of a full
+        route round-trip per message.
+        Args:
+            message: The message to route.
+        """
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.ensure_future(self._drain_outbox())
+        self._outbox.put_nowait(message)
+    async def _drain_outbox(self) -> None:
+        """Drain queued messages in batches, flushing on full or timeout."""
+        while True:
+            batch = [await self._outbox.get()]
+            while len(batch) < self.OUTBOX_BATCH_SIZE:
+                try:
+                    batch.append(self._outbox.get_nowait())
+                except asyncio.QueueEmpty:
+                    try:
+                        batch.append(await asyncio.wait_for(
+                            self._outbox.get(), self.OUTBOX_FLUSH_INTERVAL
+                        ))
+                    except asyncio.TimeoutError:
+                        break
+            await self.mcp_server.route_batch(batch)
+    async def stop(self) -> None:
+        """Stop the agent and cancel the outbox drain task."""
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            self._drain_task = None
+        await super().stop()
     def setup_handlers(self):
         """Set up message handlers for this agent"""
+        self.register_handler(MessageType.LLM_REQUEST, self.handle_llm_request)
         self.register_handler("USER_QUERY", self.handle_user_query)
         self.register_handler("UPLOAD_DOCUMENT", self.handle_upload_document)
         self.register_handler("DOCUMENT_INGESTED", self.handle_document_ingested)
@@ -24,38 +63,107 @@ class CoordinatorAgent(BaseAgent):
         self.register_handler("SEARCH_RESULTS", self.handle_search_results)
         self.register_handler("GENERATE_RESPONSE", self.handle_generate_response)
         self.register_handler("RESPONSE_GENERATED", self.handle_response_generated)
-        self.register_handler("ERROR", self.handle_error)
+        self.register_handler("ERROR", self.handle_error_message)
+    async def handle_llm_request(self, message: MCPMessage) -> Optional[Message]:
+        """
+        Answer a user query end-to-end and return the response message.
+        Runs retrieval and generation synchronously through route_message so
+        the caller (the chat endpoint) gets the generated answer back.
+        """
+        query = message.payload.get("query")
+        if not query:
+            await self.handle_error(ValueError("No query provided in the message payload"), message.trace_id)
+            return message.reply(
+                message_type=MessageType.ERROR,
+                payload={"error": "No query provided", "trace_id": message.trace_id}
+            )
+        try:
+            retrieval_response = await self.mcp_server.route_message(Message.create(
+                message_type=MessageType.RETRIEVAL_REQUEST,
+                sender=self.agent_id,
+                receiver="retrieval_agent",
+                trace_id=message.trace_id,
+                payload={"query": query, "top_k": message.payload.get("top_k", 5)}
+            ))
+            retrieved_chunks = retrieval_response.payload.get("retrieved_chunks", []) if retrieval_response else []
+            generate_response = await self.mcp_server.route_message(Message.create(
+                message_type="GENERATE_RESPONSE",
+                sender=self.agent_id,
+                receiver="response_agent",
+                trace_id=message.trace_id,
+                payload={"query": query, "context": retrieved_chunks}
+            ))
+            if generate_response is None:
+                raise RuntimeError("No response generated")
+            return Message.create(
+                message_type=MessageType.LLM_RESPONSE,
+                sender=self.agent_id,
+                receiver=message.sender,
+                trace_id=message.trace_id,
+                payload={
+                    "status": "success",
+                    "query": query,
+                    "response": generate_response.payload.get("response", ""),
+                    "sources": list(dict.fromkeys(
+                        source for chunk in retrieved_chunks
+                        if (source := chunk.get("metadata", {}).get("source")) is not None
+                    )),
+                    "trace_id": message.trace_id
+                }
+            )
+        except Exception as e:
+            self.logger.error(f"Error handling LLM request: {str(e)}")
+            await self.handle_error(e, message.trace_id)
+            return message.reply(
+                message_type=MessageType.ERROR,
+                payload={"error": str(e), "trace_id": message.trace_id}
+            )
     async def handle_user_query(self, message: MCPMessage) -> None:
         """Handle a user query by searching the knowledge base and generating a response"""
+        query = message.payload.get("query")
+        if not query:
+            await self.handle_error(ValueError("No query provided in the message payload"), message.trace_id)
+            return
         try:
-            query = message.payload.get("query")
-            if not query:
-                raise ValueError("No query provided in the message payload")
-            search_message = MCPMessage(
+            if message.payload.get("skip_retrieval") or message.payload.get("context"):
+                response_message = Message.create(
+                    message_type="GENERATE_RESPONSE",
+                    sender=self.agent_id,
+                    receiver="response_agent",
+                    trace_id=message.trace_id,
+                    payload={
+                        "query": query,
+                        "context": message.payload.get("context", [])
+                    }
+                )
+                self.enqueue_message(response_message)
+                return
+            search_message = Message.create(
+                message_type="SEARCH_KNOWLEDGE_BASE",
                 sender=self.agent_id,
                 receiver="retrieval_agent",
-                message_type="SEARCH_KNOWLEDGE_BASE",
                 trace_id=message.trace_id,
                 payload={"query": query}
             )
-            await self.send_message(search_message)
+            self.enqueue_message(search_message)
         except Exception as e:
             self.logger.error(f"Error handling user query: {str(e)}")
             await self.handle_error(e, message.trace_id)
     async def handle_upload_document(self, message: MCPMessage) -> None:
         """Handle document upload by sending it to the ingestion agent"""
+        file_path = message.payload.get("file_path")
+        if not file_path:
+            await self.handle_error(ValueError("No file path provided in the message payload"), message.trace_id)
+            return
         try:
-            file_path = message.payload.get("file_path")
-            if not file_path:
-                raise ValueError("No file path provided in the message payload")
-            ingest_message = MCPMessage(
+            ingest_message = Message.create(
+                message_type="INGEST_DOCUMENT",
                 sender=self.agent_id,
                 receiver="ingestion_agent",
-                message_type="INGEST_DOCUMENT",
                 trace_id=message.trace_id,
                 payload={"file_path": file_path}
             )
-            await self.send_message(ingest_message)
+            self.enqueue_message(ingest_message)
         except Exception as e:
             self.logger.error(f"Error handling document upload: {str(e)}")
             await self.handle_error(e, message.trace_id)
@@ -69,68 +177,75 @@ class CoordinatorAgent(BaseAgent):
     async def handle_search_knowledge_base(self, message: MCPMessage) -> None:
         """Handle search knowledge base request"""
         try:
-            search_message = MCPMessage(
+            search_message = Message.create(
+                message_type="SEARCH_KNOWLEDGE_BASE",
                 sender=self.agent_id,
                 receiver="retrieval_agent",
-                message_type="SEARCH_KNOWLEDGE_BASE",
                 trace_id=message.trace_id,
                 payload=message.payload
             )
-            await self.send_message(search_message)
+            self.enqueue_message(search_message)
         except Exception as e:
             self.logger.error(f"Error searching knowledge base: {str(e)}")
             await self.handle_error(e, message.trace_id)
     async def handle_search_results(self, message: MCPMessage) -> None:
         """Handle search results from the retrieval agent"""
         try:
-            response_message = MCPMessage(
+            response_message = Message.create(
+                message_type="GENERATE_RESPONSE",
                 sender=self.agent_id,
                 receiver="response_agent",
-                message_type="GENERATE_RESPONSE",
                 trace_id=message.trace_id,
                 payload={
                     "query": message.payload.get("query"),
                     "context": message.payload.get("results", [])
                 }
             )
-            await self.send_message(response_message)
+            self.enqueue_message(response_message)
         except Exception as e:
             self.logger.error(f"Error handling search results: {str(e)}")
             await self.handle_error(e, message.trace_id)
     async def handle_generate_response(self, message: MCPMessage) -> None:
         """Handle generate response request"""
         try:
-            response_message = MCPMessage(
+            response_message = Message.create(
+                message_type="GENERATE_RESPONSE",
                 sender=self.agent_id,
                 receiver="response_agent",
-                message_type="GENERATE_RESPONSE",
                 trace_id=message.trace_id,
                 payload=message.payload
             )
-            await self.send_message(response_message)
+            self.enqueue_message(response_message)
         except Exception as e:
             self.logger.error(f"Error generating response: {str(e)}")
             await self.handle_error(e, message.trace_id)
     async def handle_response_generated(self, message: MCPMessage) -> None:
         """Handle response from the response agent"""
         try:
-            self.logger.info(f"Response generated: {message.payload.get('response')}")
-            print(f"\nResponse: {message.payload.get('response')}")
+            self.logger.info("Response generated: %s", message.payload.get('response'))
         except Exception as e:
             self.logger.error(f"Error handling generated response: {str(e)}")
             await self.handle_error(e, message.trace_id)
+    async def handle_error_message(self, message: MCPMessage) -> None:
+        """Log ERROR messages routed to the coordinator without re-emitting"""
+        self.logger.error(
+            "Error reported by %s: %s, trace_id: %s",
+            message.payload.get("agent_id", message.sender),
+            message.payload.get("error"),
+            message.trace_id
+        )
     async def handle_error(self, error: Exception, trace_id: Optional[str] = None) -> None:
         """Handle errors in the coordinator"""
         error_message = f"Error in CoordinatorAgent: {str(error)}"
         self.logger.error(error_message)
-        error_msg = MCPMessage(
-            sender=self.agent_id,
-            receiver="error_handler",
+        error_msg = Message.create(
             message_type="ERROR",
+            sender=self.agent_id,
+            receiver="coordinator",
             trace_id=trace_id or "unknown",
             payload={
                 "error": str(error),
                 "source": "CoordinatorAgent"
             }
         )
-        print(f"\nERROR: {error_message}")
\ No newline at end of file
+        self.enqueue_message(error_msg)
\ No newline at end of file
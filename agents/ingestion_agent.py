@@ -1,16 +1,84 @@
 import os
+import aiofiles
+import aiofiles.os
 import asyncio
 import datetime
+import hashlib
+import pickle
+from collections import ChainMap
 import logging
+import re
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, Any, List, Optional, Union
 from pathlib import Path
 from core.mcp import Message, MessageType
 from core.document_processor import DocumentProcessor
 from storage.vector_store import VectorStore
+from storage.embedding_cache import EmbeddingCache
 from agents.base_agent import BaseAgent
+_SAFE_FILENAME_RE = re.compile(r'[^A-Za-z0-9._\- ]')
+def _process_and_chunk(
+    file_path: str,
+    metadata: Dict[str, Any],
+    chunk_size: int,
+    overlap: int,
+    cache_dir: Optional[str] = None
+) -> tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Parse a document and chunk its content in one worker invocation.
+    Module-level so it is picklable for ProcessPoolExecutor; running parse
+    and chunking together keeps the document content in the worker instead
+    of shipping it across the process boundary twice.
+    Args:
+        file_path: Path to the file to process.
+        metadata: Metadata to attach to the document.
+        chunk_size: Maximum size of each chunk in characters.
+        overlap: Number of characters to overlap between chunks.
+    Returns:
+        Tuple of (process_document result, chunks).
+    """
+    try:
+        stat_result = os.stat(file_path)
+        chunks = None
+        cache_path = None
+        if cache_dir:
+            key = hashlib.blake2b(
+                f"{file_path}:{stat_result.st_size}:{stat_result.st_mtime}:{chunk_size}:{overlap}".encode("utf-8")
+            ).hexdigest()
+            cache_path = os.path.join(cache_dir, f"{key}.pkl")
+            if os.path.exists(cache_path):
+                with open(cache_path, "rb") as f:
+                    chunks = pickle.load(f)
+        if chunks is None:
+            separator = "" if file_path.lower().endswith(".txt") else "\n\n"
+            chunks = list(DocumentProcessor.chunk_stream(
+                DocumentProcessor.iter_text_parts(file_path),
+                chunk_size=chunk_size,
+                overlap=overlap,
+                separator=separator
+            ))
+            if cache_path is not None:
+                with open(cache_path, "wb") as f:
+                    pickle.dump(chunks, f, protocol=5)
+    except Exception as e:
+        return {"success": False, "error": str(e), "file_path": file_path, "metadata": metadata}, []
+    result = {
+        "success": True,
+        "metadata": {
+            "file_path": file_path,
+            "file_name": os.path.basename(file_path),
+            "file_extension": os.path.splitext(file_path)[1].lower(),
+            "file_size": stat_result.st_size,
+            "last_modified": stat_result.st_mtime,
+            **metadata
+        }
+    }
+    return result, chunks
 class IngestionAgent(BaseAgent):
     """Agent responsible for ingesting and processing documents."""
+    STORE_BATCH_SIZE = 256
     def __init__(self, mcp_server: Any, vector_store: VectorStore, upload_dir: str = "./uploads") -> None:
         """
         Initialize the Ingestion Agent.
@@ -22,8 +90,15 @@ class IngestionAgent(BaseAgent):
         super().__init__("ingestion_agent", mcp_server)
         self.vector_store = vector_store
         self.document_processor = DocumentProcessor()
+        self._executor = ProcessPoolExecutor(max_workers=os.cpu_count())
         self.upload_dir = Path(upload_dir)
         self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self._embed_cache = EmbeddingCache(
+            self.upload_dir / ".embed_cache.db",
+            model=getattr(vector_store, "model_name", "unknown")
+        )
+        self._doc_cache_dir = self.upload_dir / ".doc_cache"
+        self._doc_cache_dir.mkdir(exist_ok=True)
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
         self.setup_handlers()
@@ -47,7 +122,8 @@ class IngestionAgent(BaseAgent):
                 message_type=MessageType.ERROR,
                 payload={
                     "error": str(e),
-                    "original_message": message.dict()
+                    "original_message_id": message.message_id,
+                    "original_message_type": str(message.message_type)
                 }
             )
             return error_response
@@ -60,7 +136,7 @@ class IngestionAgent(BaseAgent):
             Response message with the result of the ingestion.
         """
         trace_id = message.payload.get("trace_id", str(uuid.uuid4()))
-        self.logger.info(f"Received ingestion request, trace_id: {trace_id}")
+        self.logger.info("Received ingestion request, trace_id: %s", trace_id)
         try:
             action = message.payload.get("action")
             if action == "clear_knowledge_base":
@@ -87,6 +163,8 @@ class IngestionAgent(BaseAgent):
                     }
                 )
             file_paths = message.payload.get("file_paths", [])
+            if not file_paths and message.payload.get("file_path"):
+                file_paths = [message.payload["file_path"]]
             if not file_paths:
                 raise ValueError("No file paths provided in the ingestion request")
             return await self.process_files(file_paths, message.sender, trace_id)
@@ -118,44 +196,36 @@ class IngestionAgent(BaseAgent):
         Returns:
             Response message with the result of the processing.
         """
-        processed_docs = []
+        processed_count = 0
         processing_errors = []
-        for file_path in file_paths:
-            file_path = Path(file_path)
-            if not file_path.exists():
-                error_msg = f"File not found: {file_path}"
-                self.logger.warning(f"{error_msg}, trace_id: {trace_id}")
+        batch = []
+        pending_paths = [Path(file_path) for file_path in file_paths]
+        tasks = [
+            self.process_single_file(file_path, trace_id)
+            for file_path in pending_paths
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for file_path, result in zip(pending_paths, results):
+            if isinstance(result, BaseException):
+                error_msg = f"Error processing {file_path.name}: {str(result)}"
+                self.logger.error(f"{error_msg}, trace_id: {trace_id}", exc_info=result)
                 processing_errors.append({
                     "file": str(file_path),
-                    "error": "File not found",
+                    "error": str(result),
                     "trace_id": trace_id
                 })
                 continue
-            try:
-                file_docs, file_errors = await self.process_single_file(file_path, trace_id)
-                processed_docs.extend(file_docs)
-                processing_errors.extend(file_errors)
-            except Exception as e:
-                error_msg = f"Error processing {file_path.name}: {str(e)}"
-                self.logger.error(f"{error_msg}, trace_id: {trace_id}", exc_info=True)
-                processing_errors.append({
-                    "file": str(file_path),
-                    "error": str(e),
-                    "trace_id": trace_id
-                })
-        if processed_docs:
-            try:
-                await self.store_documents(processed_docs, trace_id)
-            except Exception as e:
-                error_msg = f"Error storing documents in vector store: {str(e)}"
-                self.logger.error(f"{error_msg}, trace_id: {trace_id}", exc_info=True)
-                processing_errors.append({
-                    "error": error_msg,
-                    "trace_id": trace_id
-                })
+            file_docs, file_errors = result
+            processing_errors.extend(file_errors)
+            for doc in file_docs:
+                batch.append(doc)
+                if len(batch) >= self.STORE_BATCH_SIZE:
+                    processed_count += await self._flush_batch(batch, processing_errors, trace_id)
+        if batch:
+            processed_count += await self._flush_batch(batch, processing_errors, trace_id)
         response_payload = {
-            "status": "success" if not processing_errors else "partial_success" if processed_docs else "error",
-            "processed_count": len(processed_docs),
+            "status": "success" if not processing_errors else "partial_success" if processed_count else "error",
+            "processed_count": processed_count,
             "error_count": len(processing_errors),
             "trace_id": trace_id
         }
@@ -167,13 +237,48 @@ class IngestionAgent(BaseAgent):
             message_type=MessageType.INGESTION_RESPONSE,
             payload=response_payload
         )
+    async def stop(self) -> None:
+        """Stop the agent and shut down the parsing process pool."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        await super().stop()
+    async def _flush_batch(
+        self,
+        batch: List[Dict[str, Any]],
+        processing_errors: List[Dict[str, Any]],
+        trace_id: str
+    ) -> int:
+        """
+        Store a batch of chunks and clear it, recording any storage error.
+        Args:
+            batch: Accumulated chunk dicts; cleared in place after the flush.
+            processing_errors: Error list to append storage failures to.
+            trace_id: Trace ID for logging and tracking.
+        Returns:
+            Number of chunks successfully handed to the vector store.
+        """
+        count = len(batch)
+        try:
+            await self.store_documents(batch, trace_id)
+        except Exception as e:
+            error_msg = f"Error storing documents in vector store: {str(e)}"
+            self.logger.error(f"{error_msg}, trace_id: {trace_id}", exc_info=True)
+            processing_errors.append({
+                "error": error_msg,
+                "trace_id": trace_id
+            })
+            count = 0
+        finally:
+            batch.clear()
+        return count
     async def process_single_file(
-        self, 
-        file_path: Path, 
+        self,
+        file_path: Path,
         trace_id: str
     ) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
         Process a single file for ingestion.
+        CPU-heavy parsing and chunking run in the agent's process pool so
+        concurrent files exploit multiple cores without blocking the loop.
         Args:
             file_path: Path to the file to process.
             trace_id: Trace ID for logging and tracking.
@@ -182,56 +287,63 @@ class IngestionAgent(BaseAgent):
         """
         processed_docs = []
         processing_errors = []
+        file_name = file_path.name
+        file_stem = file_path.stem
+        try:
+            stat_result = await aiofiles.os.stat(file_path)
+        except FileNotFoundError:
+            error_msg = f"File not found: {file_path}"
+            self.logger.warning(f"{error_msg}, trace_id: {trace_id}")
+            processing_errors.append({
+                "file": str(file_path),
+                "error": "File not found",
+                "trace_id": trace_id
+            })
+            return processed_docs, processing_errors
         file_metadata = {
-            "source": file_path.name,
-            "ingestion_timestamp": datetime.datetime.utcnow().isoformat(),
-            "file_size": file_path.stat().st_size,
+            "source": file_name,
+            "ingestion_timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "file_size": stat_result.st_size,
             "trace_id": trace_id
         }
-        start_time = datetime.datetime.now()
-        result = self.document_processor.process_document(
-            file_path=str(file_path),
-            metadata=file_metadata
+        start_time = time.perf_counter()
+        result, chunks = await asyncio.get_running_loop().run_in_executor(
+            self._executor, _process_and_chunk, str(file_path), file_metadata, 1000, 200,
+            str(self._doc_cache_dir)
         )
-        processing_time = (datetime.datetime.now() - start_time).total_seconds()
+        processing_time = time.perf_counter() - start_time
         if not result.get("success", True):
             error_msg = result.get("error", "Unknown error processing document")
-            self.logger.warning(f"Failed to process {file_path.name}: {error_msg}, trace_id: {trace_id}")
+            self.logger.warning(f"Failed to process {file_name}: {error_msg}, trace_id: {trace_id}")
             processing_errors.append({
                 "file": str(file_path),
                 "error": error_msg,
                 "trace_id": trace_id
             })
             return processed_docs, processing_errors
-        content = result.get("content", "")
-        if not content.strip():
-            self.logger.warning(f"No content extracted from {file_path.name}, trace_id: {trace_id}")
+        if not any(chunk["text"].strip() for chunk in chunks):
+            self.logger.warning(f"No content extracted from {file_name}, trace_id: {trace_id}")
             processing_errors.append({
                 "file": str(file_path),
                 "error": "No content extracted",
                 "trace_id": trace_id
             })
             return processed_docs, processing_errors
-        chunks = self.document_processor.chunk_text(
-            content=content,
-            chunk_size=1000,
-            overlap=200
-        )
+        base_metadata = result.get("metadata", {})
         for chunk in chunks:
-            chunk_metadata = {
-                **result.get("metadata", {}),
+            chunk_metadata = ChainMap({
                 "chunk_start": chunk["start"],
                 "chunk_end": chunk["end"],
-                "chunk_id": f"{file_path.stem}_{chunk['start']}_{chunk['end']}",
+                "chunk_id": f"{file_stem}_{chunk['start']}_{chunk['end']}",
                 "trace_id": trace_id
-            }
+            }, base_metadata)
             processed_docs.append({
                 "text": chunk["text"],
                 "metadata": chunk_metadata
             })
         self.logger.info(
-            f"Processed {len(chunks)} chunks from {file_path.name} "
-            f"in {processing_time:.2f}s, trace_id: {trace_id}"
+            "Processed %d chunks from %s in %.2fs, trace_id: %s",
+            len(chunks), file_name, processing_time, trace_id
         )
         return processed_docs, processing_errors
     async def store_documents(self, documents: List[Dict[str, Any]], trace_id: str) -> None:
@@ -241,17 +353,40 @@ class IngestionAgent(BaseAgent):
             documents: List of documents to store.
             trace_id: Trace ID for logging and tracking.
         """
-        self.logger.info(f"Storing {len(documents)} document chunks in vector store, trace_id: {trace_id}")
-        start_time = datetime.datetime.now()
-        store_docs = []
+        self.logger.info("Storing %d document chunks in vector store, trace_id: %s", len(documents), trace_id)
+        start_time = time.perf_counter()
+        groups = {}
         for doc in documents:
-            store_docs.append({
-                'text': doc.get('text', ''),
-                'metadata': doc.get('metadata', {})
-            })
-        doc_ids = await self.vector_store.add_documents(store_docs)
-        storage_time = (datetime.datetime.now() - start_time).total_seconds()
-        self.logger.info(f"Stored {len(doc_ids)} document chunks in {storage_time:.2f}s, trace_id: {trace_id}")
+            groups.setdefault(doc.get('text', ''), []).append(doc)
+        if len(groups) < len(documents):
+            self.logger.info(
+                "Embedding %d unique texts for %d chunks in batch, trace_id: %s",
+                len(groups), len(documents), trace_id
+            )
+        vectors_by_text = {}
+        miss_texts = []
+        for text in groups:
+            vector = self._embed_cache.get(text)
+            if vector is not None:
+                vectors_by_text[text] = vector
+            else:
+                miss_texts.append(text)
+        if miss_texts:
+            miss_vectors = await self.vector_store.embed_texts(miss_texts)
+            self._embed_cache.put_many(miss_texts, miss_vectors)
+            vectors_by_text.update(zip(miss_texts, miss_vectors))
+        store_docs = []
+        store_vectors = []
+        for text, sibling_docs in groups.items():
+            for doc in sibling_docs:
+                store_docs.append(doc)
+                store_vectors.append(vectors_by_text[text])
+        doc_ids = await self.vector_store.add_documents_with_vectors(store_docs, store_vectors)
+        storage_time = time.perf_counter() - start_time
+        self.logger.info(
+            "Stored %d document chunks in %.2fs (embed cache hit rate: %.0f%%), trace_id: %s",
+            len(doc_ids), storage_time, self._embed_cache.hit_rate() * 100, trace_id
+        )
     async def clear_knowledge_base(self) -> None:
         """
         Clear all documents from the vector store.
@@ -278,14 +413,14 @@ class IngestionAgent(BaseAgent):
             RuntimeError: If there's an error saving the file.
         """
         try:
-            file_ext = Path(filename).suffix
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
+            file_ext = _SAFE_FILENAME_RE.sub('_', Path(filename).suffix)
+            unique_filename = f"{uuid.uuid4().hex}{file_ext}"
             file_path = self.upload_dir / unique_filename
-            with open(file_path, "wb") as f:
-                content = file.read()
-                if hasattr(content, 'decode'):
-                    content = content.decode('utf-8')
-                f.write(content)
+            async with aiofiles.open(file_path, "wb") as f:
+                while chunk := file.read(1 << 20):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    await f.write(chunk)
             self.logger.info(f"Saved uploaded file: {file_path}")
             return file_path
         except Exception as e:
@@ -1,7 +1,13 @@
+import asyncio
+import hashlib
+import logging
 import os
+import time
+from collections import OrderedDict, deque
 from typing import Dict, Any, List, Optional, Union, Callable, Literal
+import io
 import json
-import requests
+import httpx
 from enum import Enum
 from core.mcp import Message, MessageType
 from agents.base_agent import BaseAgent
@@ -10,12 +16,14 @@ class LLMProvider(Enum):
     HUGGINGFACE = "huggingface"
     OLLAMA = "ollama"
     LOCAL = "local"
+_ROLE_NAMES = {"user": "User", "assistant": "Assistant", "system": "Assistant"}
 class LLMClient:
     """Wrapper class for different LLM providers"""
     def __init__(
-        self, 
-        provider: str = "openai", 
-        model_name: str = None, 
+        self,
+        provider: str = "openai",
+        model_name: str = None,
+        http_client: Optional[httpx.AsyncClient] = None,
         **kwargs
     ):
         """
@@ -23,11 +31,19 @@ class LLMClient:
         Args:
             provider: LLM provider (openai, huggingface, ollama, local)
             model_name: Name of the model to use
+            http_client: Optional shared httpx.AsyncClient; the caller that
+                provides one owns its lifecycle
             **kwargs: Additional provider-specific arguments
         """
         self.provider = LLMProvider(provider.lower())
         self.model_name = model_name or self._get_default_model()
+        self._ollama_checked = False
         self.client = self._initialize_client(**kwargs)
+        self._owns_http = http_client is None
+        self._http = http_client or httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
     def _get_default_model(self) -> str:
         """Get default model name based on provider"""
         defaults = {
@@ -52,12 +68,7 @@ class LLMClient:
                     raise ValueError("HUGGINGFACEHUB_API_TOKEN environment variable is required")
                 return {"api_key": api_key}
             elif self.provider == LLMProvider.OLLAMA:
-                try:
-                    response = requests.get("http://localhost:11434/api/tags")
-                    response.raise_for_status()
-                except Exception as e:
-                    raise ConnectionError("Ollama server is not running. Please start it with 'ollama serve'") from e
-                return None  
+                return None
             elif self.provider == LLMProvider.LOCAL:
                 try:
                     from llama_cpp import Llama
@@ -72,8 +83,17 @@ class LLMClient:
                 raise ValueError(f"Unsupported LLM provider: {self.provider}")
         except ImportError as e:
             raise ImportError(f"Failed to initialize {self.provider} client. Make sure you have installed the required dependencies.") from e
+    @staticmethod
+    def _format_prompt(messages: List[Dict[str, str]]) -> str:
+        """Format chat messages into a role-prefixed completion prompt."""
+        buf = io.StringIO()
+        for msg in messages:
+            role = _ROLE_NAMES.get(msg["role"], "Assistant")
+            buf.write(f"{role}: {msg['content']}\n")
+        buf.write("Assistant: ")
+        return buf.getvalue()
     async def generate(
-        self, 
+        self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int = 1000,
@@ -90,7 +110,8 @@ class LLMClient:
             Generated text response
         """
         if self.provider == LLMProvider.OPENAI:
-            response = self.client.chat.completions.create(
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model=self.model_name,
                 messages=messages,
                 temperature=temperature,
@@ -103,11 +124,7 @@ class LLMClient:
                 "Authorization": f"Bearer {self.client['api_key']}",
                 "Content-Type": "application/json"
             }
-            prompt = ""
-            for msg in messages:
-                role = "User" if msg["role"] == "user" else "Assistant"
-                prompt += f"{role}: {msg['content']}\n"
-            prompt += "Assistant: "
+            prompt = self._format_prompt(messages)
             data = {
                 "inputs": prompt,
                 "parameters": {
@@ -117,7 +134,7 @@ class LLMClient:
                     **kwargs
                 }
             }
-            response = requests.post(
+            response = await self._http.post(
                 f"https://api-inference.huggingface.co/models/{self.model_name}",
                 headers=headers,
                 json=data
@@ -125,6 +142,13 @@ class LLMClient:
             response.raise_for_status()
             return response.json()[0]["generated_text"]
         elif self.provider == LLMProvider.OLLAMA:
+            if not self._ollama_checked:
+                try:
+                    response = await self._http.get("http://localhost:11434/api/tags")
+                    response.raise_for_status()
+                except Exception as e:
+                    raise ConnectionError("Ollama server is not running. Please start it with 'ollama serve'") from e
+                self._ollama_checked = True
             formatted_messages = []
             for msg in messages:
                 formatted_messages.append({
@@ -140,19 +164,16 @@ class LLMClient:
                     **kwargs
                 }
             }
-            response = requests.post(
+            response = await self._http.post(
                 "http://localhost:11434/api/chat",
                 json=data
             )
             response.raise_for_status()
             return response.json()["message"]["content"]
         elif self.provider == LLMProvider.LOCAL:
-            prompt = ""
-            for msg in messages:
-                role = "User" if msg["role"] == "user" else "Assistant"
-                prompt += f"{role}: {msg['content']}\n"
-            prompt += "Assistant: "
-            response = self.client(
+            prompt = self._format_prompt(messages)
+            response = await asyncio.to_thread(
+                self.client,
                 prompt,
                 temperature=temperature,
                 max_tokens=max_tokens,
@@ -161,8 +182,26 @@ class LLMClient:
             return response["choices"][0]["text"]
         else:
             raise ValueError(f"Generation not implemented for provider: {self.provider}")
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client if this instance owns it."""
+        if self._owns_http:
+            await self._http.aclose()
 class LLMResponseAgent(BaseAgent):
     """Agent responsible for generating responses using LLM"""
+    CONVERSATION_HISTORY_SIZE = 8
+    RESPONSE_CACHE_SIZE = 1024
+    RESPONSE_CACHE_TTL = 3600.0
+    SYSTEM_PROMPT = (
+        "You are a helpful AI assistant that answers questions based on the provided context.\n"
+        "If the context doesn't contain the answer, say \"I don't have enough information to answer that question.\"\n"
+        "Be concise and accurate in your responses."
+    )
+    USER_TEMPLATE = (
+        "Context:\n{context}\n\n"
+        "Question: {query}\n\n"
+        "Answer based on the context above. If the context doesn't contain the answer, "
+        "say \"I don't have enough information to answer that question.\""
+    )
     def __init__(
         self, 
         mcp_server, 
@@ -181,6 +220,7 @@ class LLMResponseAgent(BaseAgent):
             max_tokens: Maximum number of tokens to generate
         """
         super().__init__("llm_response_agent", mcp_server)
+        self.logger = logging.getLogger(__name__)
         self.provider = provider.lower()
         self.model_name = model_name
         self.temperature = float(os.getenv("LLM_TEMPERATURE", temperature))
@@ -190,6 +230,32 @@ class LLMResponseAgent(BaseAgent):
             model_name=self.model_name
         )
         self.conversation_history = {}
+        self._response_cache = OrderedDict()
+    def _cache_key(self, query: str, context: List[Dict[str, Any]]) -> bytes:
+        """Compute the cache key for a (query, retrieved context) pair."""
+        chunk_ids = sorted(
+            chunk.get("metadata", {}).get("chunk_id", "") for chunk in context
+        )
+        return hashlib.blake2b(
+            f"{query}|{'|'.join(chunk_ids)}".encode("utf-8"), digest_size=16
+        ).digest()
+    def _cache_get(self, key: bytes) -> Optional[str]:
+        """Return a cached response if present and not expired."""
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        response_text, expires_at = entry
+        if time.monotonic() > expires_at:
+            del self._response_cache[key]
+            return None
+        self._response_cache.move_to_end(key)
+        return response_text
+    def _cache_put(self, key: bytes, response_text: str) -> None:
+        """Insert a response, evicting the oldest entries past capacity."""
+        self._response_cache[key] = (response_text, time.monotonic() + self.RESPONSE_CACHE_TTL)
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > self.RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
     def setup_handlers(self):
         """Set up message handlers for this agent"""
         self.register_handler(MessageType.LLM_REQUEST, self.handle_llm_request)
@@ -207,40 +273,44 @@ class LLMResponseAgent(BaseAgent):
             if not query:
                 raise ValueError("No query provided in LLM request")
             if conversation_id not in self.conversation_history:
-                self.conversation_history[conversation_id] = []
-            context_str = "\n\n".join([
+                self.conversation_history[conversation_id] = deque(maxlen=self.CONVERSATION_HISTORY_SIZE)
+            context = sorted(
+                context,
+                key=lambda chunk: chunk.get("metadata", {}).get("chunk_id", "")
+            )
+            context_str = "\n\n".join(
                 f"[Source: {chunk.get('metadata', {}).get('source', 'unknown')}]\n{chunk['text']}"
                 for chunk in context
-            ])
-            system_prompt = """You are a helpful AI assistant that answers questions based on the provided context. 
-            If the context doesn't contain the answer, say "I don't have enough information to answer that question."
-            Be concise and accurate in your responses."""
+                if chunk.get('text')
+            )
             messages = [
-                {"role": "system", "content": system_prompt}
+                {"role": "system", "content": self.SYSTEM_PROMPT}
             ]
-            for msg in self.conversation_history[conversation_id][-4:]:  
+            for msg in self.conversation_history[conversation_id]:
                 messages.append({"role": "user", "content": msg["query"]})
                 if "response" in msg:
                     messages.append({"role": "assistant", "content": msg["response"]})
             if context_str:
-                user_message = f"""Context:
-                {context_str}
-                Question: {query}
-                Answer based on the context above. If the context doesn't contain the answer, say "I don't have enough information to answer that question."
-                """
+                user_message = self.USER_TEMPLATE.format(context=context_str, query=query)
             else:
                 user_message = query
             messages.append({"role": "user", "content": user_message})
-            response_text = await asyncio.to_thread(
-                self.llm_client.generate,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
+            cache_key = None
+            response_text = None
+            if self.temperature <= 0.1:
+                cache_key = self._cache_key(query, context)
+                response_text = self._cache_get(cache_key)
+            if response_text is None:
+                response_text = await self.llm_client.generate(
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens
+                )
+                if cache_key is not None:
+                    self._cache_put(cache_key, response_text)
             self.conversation_history[conversation_id].append({
                 "query": query,
-                "response": response_text,
-                "context": context
+                "response": response_text
             })
             await self.send_message(
                 receiver_id=message.sender,
@@ -249,14 +319,21 @@ class LLMResponseAgent(BaseAgent):
                     "status": "success",
                     "query": query,
                     "response": response_text,
-                    "sources": [chunk.get("metadata", {}).get("source") for chunk in context],
+                    "sources": list(dict.fromkeys(
+                        source for chunk in context
+                        if (source := chunk.get("metadata", {}).get("source")) is not None
+                    )),
                     "trace_id": message.trace_id
                 }
             )
         except Exception as e:
-            print(f"Error in LLM response agent: {e}")
+            self.logger.error("Error in LLM response agent: %s", e, exc_info=True)
             await self.handle_error(e, message.trace_id)
+    async def stop(self) -> None:
+        """Stop the agent and release the pooled HTTP connections."""
+        await self.llm_client.aclose()
+        await super().stop()
     def clear_conversation(self, conversation_id: str = "default"):
         """Clear the conversation history for a given conversation ID"""
         if conversation_id in self.conversation_history:
-            self.conversation_history[conversation_id] = []
\ No newline at end of file
+            self.conversation_history[conversation_id].clear()
\ No newline at end of file
@@ -1,3 +1,6 @@
+import asyncio
+import copy
+import os
 from typing import Dict, Any, Optional, List
 import torch
 from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
@@ -5,6 +8,12 @@ from agents.base_agent import BaseAgent, MCPMessage
 import logging
 class ResponseAgent(BaseAgent):
     """Generates responses using an LLM"""
+    GENERATE_BATCH_SIZE = 16
+    GENERATE_BATCH_WINDOW = 0.01
+    PROMPT_PREFIX = (
+        "You are a helpful AI assistant. Use the following context to answer the user's question. "
+        "If you don't know the answer, say you don't know.\n\n"
+    )
     def __init__(self, mcp_server=None, model_name: str = 'distilgpt2'):
         """
         Initialize the Response Agent
@@ -18,6 +27,10 @@ class ResponseAgent(BaseAgent):
         self.tokenizer = None
         self.model = None
         self.logger = logging.getLogger(__name__)
+        self._generate_queue = asyncio.Queue()
+        self._batch_task = None
+        self._prefix_kv = None
+        self._prefix_len = 0
         self.setup_handlers()
     def setup_handlers(self):
         """Set up message handlers for this agent"""
@@ -27,18 +40,70 @@ class ResponseAgent(BaseAgent):
         if self.model is None or self.tokenizer is None:
             try:
                 self.logger.info(f"Loading tokenizer for {self.model_name}...")
-                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
                 self.logger.info(f"Loading model {self.model_name}...")
-                self.model = AutoModelForCausalLM.from_pretrained(
-                    self.model_name,
-                    torch_dtype=torch.float32
-                ).to(self.device)
+                self.dtype = torch.float16 if self.device == 'cuda' else torch.bfloat16
+                self.model = None
+                if self.device == 'cuda' and os.getenv("LLM_LOAD_IN_8BIT", "").lower() in ("1", "true", "yes"):
+                    try:
+                        from transformers import BitsAndBytesConfig
+                        self.model = AutoModelForCausalLM.from_pretrained(
+                            self.model_name,
+                            quantization_config=BitsAndBytesConfig(
+                                load_in_8bit=True,
+                                llm_int8_threshold=float(os.getenv("LLM_INT8_THRESHOLD", "6.0"))
+                            ),
+                            device_map="auto"
+                        )
+                        self.logger.info("Loaded model with int8 weight-only quantization")
+                    except ImportError:
+                        self.logger.warning("bitsandbytes not installed, falling back to fp16/bf16 weights")
+                if self.model is None:
+                    self.model = AutoModelForCausalLM.from_pretrained(
+                        self.model_name,
+                        torch_dtype=self.dtype,
+                        low_cpu_mem_usage=True,
+                        attn_implementation="sdpa"
+                    ).to(self.device)
                 if self.tokenizer.pad_token is None:
                     self.tokenizer.pad_token = self.tokenizer.eos_token
+                os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.join(".cache", "torchinductor"))
+                self.model = torch.compile(self.model, mode="reduce-overhead")
+                self._warmup()
+                self._prefill_prompt_prefix()
                 self.logger.info(f"Model loaded on {self.device}")
             except Exception as e:
                 self.logger.error(f"Error loading model: {str(e)}")
                 raise
+    async def stop(self) -> None:
+        """Stop the agent and cancel the generation batcher task."""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            self._batch_task = None
+        await super().stop()
+    def _warmup(self):
+        """Run one dummy generation so compile/trace cost is paid at load time"""
+        try:
+            inputs = self.tokenizer("warmup", return_tensors="pt").to(self.device)
+            with torch.no_grad():
+                self.model.generate(
+                    **inputs,
+                    max_new_tokens=1,
+                    do_sample=False,
+                    pad_token_id=self.tokenizer.pad_token_id or self.tokenizer.eos_token_id
+                )
+        except Exception as e:
+            self.logger.warning(f"Model warmup failed: {str(e)}")
+    def _prefill_prompt_prefix(self):
+        """Prefill and cache key/values for the constant prompt prefix"""
+        try:
+            prefix_ids = self.tokenizer(self.PROMPT_PREFIX, return_tensors="pt").input_ids.to(self.device)
+            with torch.no_grad():
+                self._prefix_kv = self.model(prefix_ids, use_cache=True).past_key_values
+            self._prefix_len = prefix_ids.shape[1]
+        except Exception as e:
+            self.logger.warning(f"Prompt prefix prefill failed: {str(e)}")
+            self._prefix_kv = None
     def _format_context(self, context: Any) -> str:
         """Format the context for better model understanding"""
         if not context:
@@ -60,13 +125,89 @@ class ResponseAgent(BaseAgent):
         """Create a well-structured prompt for the model"""
         formatted_context = self._format_context(context)
         return (
-            "You are a helpful AI assistant. Use the following context to answer the user's question. "
-            "If you don't know the answer, say you don't know.\n\n"
+            f"{self.PROMPT_PREFIX}"
             f"CONTEXT:\n{formatted_context}\n\n"
             f"QUESTION: {query}\n\n"
             "ANSWER:"
         )
-    async def handle_generate_response(self, message: MCPMessage) -> None:
+    async def _generate_batched(self, prompt: str, max_length: int) -> str:
+        """
+        Queue a prompt for generation and await its decoded output.
+        Concurrent requests landing within GENERATE_BATCH_WINDOW are coalesced
+        into one padded model.generate call of up to GENERATE_BATCH_SIZE
+        prompts, amortizing kernel-launch overhead across requests.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.ensure_future(self._drain_generate_queue())
+        self._generate_queue.put_nowait((prompt, max_length, future))
+        return await future
+    async def _drain_generate_queue(self) -> None:
+        """Collect queued prompts into batches and run them through the model."""
+        while True:
+            requests = [await self._generate_queue.get()]
+            while len(requests) < self.GENERATE_BATCH_SIZE:
+                try:
+                    requests.append(await asyncio.wait_for(
+                        self._generate_queue.get(), self.GENERATE_BATCH_WINDOW
+                    ))
+                except asyncio.TimeoutError:
+                    break
+            prompts = [prompt for prompt, _, _ in requests]
+            max_length = max(ml for _, ml, _ in requests)
+            try:
+                texts = await asyncio.to_thread(self._generate_batch, prompts, max_length)
+            except Exception as e:
+                for _, _, future in requests:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), text in zip(requests, texts):
+                if not future.done():
+                    future.set_result(text)
+    def _generate_batch(self, prompts: List[str], max_length: int) -> List[str]:
+        """Run one padded generate over a batch of prompts and decode each."""
+        if len(prompts) == 1 and self._prefix_kv is not None and prompts[0].startswith(self.PROMPT_PREFIX):
+            try:
+                return [self._generate_with_prefix_kv(prompts[0], max_length)]
+            except Exception as e:
+                self.logger.debug(f"Prefix KV fast path failed, falling back: {str(e)}")
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True, max_length=1024).to(self.device)
+        with torch.no_grad(), torch.autocast(device_type=self.device, dtype=self.dtype):
+            outputs = self.model.generate(
+                **inputs,
+                max_length=inputs.input_ids.shape[1] + max_length,
+                num_return_sequences=1,
+                temperature=0.7,
+                top_p=0.9,
+                top_k=50,
+                repetition_penalty=1.1,
+                do_sample=True,
+                pad_token_id=self.tokenizer.pad_token_id or self.tokenizer.eos_token_id
+            )
+        return [self.tokenizer.decode(output, skip_special_tokens=True) for output in outputs]
+    def _generate_with_prefix_kv(self, prompt: str, max_length: int) -> str:
+        """Generate a single response reusing the cached prefix key/values"""
+        # passing the full input_ids alongside the prefix past_key_values
+        # relies on generate() computing cache_position from the cache length
+        # (transformers >= 4.38, the floor pinned in requirements); older
+        # GPT-2 releases would silently drop everything but the last token
+        inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=1024).to(self.device)
+        with torch.no_grad(), torch.autocast(device_type=self.device, dtype=self.dtype):
+            outputs = self.model.generate(
+                **inputs,
+                past_key_values=copy.deepcopy(self._prefix_kv),
+                max_length=inputs.input_ids.shape[1] + max_length,
+                num_return_sequences=1,
+                temperature=0.7,
+                top_p=0.9,
+                top_k=50,
+                repetition_penalty=1.1,
+                do_sample=True,
+                pad_token_id=self.tokenizer.pad_token_id or self.tokenizer.eos_token_id
+            )
+        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+    async def handle_generate_response(self, message: MCPMessage):
         """Generate a response to the user's query with improved context handling"""
         try:
             self.logger.info(f"Processing query: {message.payload.get('query')}")
@@ -74,35 +215,19 @@ class ResponseAgent(BaseAgent):
             if not query:
                 raise ValueError("No query provided in the message payload")
             context = message.payload.get('context', '')
-            max_length = min(int(message.payload.get('max_length', 500)), 1000)  
+            max_length = min(int(message.payload.get('max_length', 500)), 1000)
             prompt = self._create_prompt(query, context)
             self.logger.debug(f"Prompt: {prompt}")
             self._load_model()
             self.logger.info("Generating response...")
-            inputs = self.tokenizer(prompt, return_tensors="pt", padding=True, truncation=True, max_length=1024).to(self.device)
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_length=len(inputs.input_ids[0]) + max_length,
-                    num_return_sequences=1,
-                    temperature=0.7,
-                    top_p=0.9,
-                    top_k=50,
-                    repetition_penalty=1.1,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.pad_token_id or self.tokenizer.eos_token_id
-                )
-            full_response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            full_response = await self._generate_batched(prompt, max_length)
             response = full_response.split('ANSWER:')[-1].strip()
             response = response.split('\n')[0].strip()  
             if not response or response.isspace():
                 response = "I'm not sure how to respond to that. Could you provide more details?"
             self.logger.info(f"Response generated: {response}")
-            response_message = MCPMessage(
-                sender=self.agent_id,
-                receiver=message.sender,
+            return message.reply(
                 message_type="RESPONSE_GENERATED",
-                trace_id=message.trace_id,
                 payload={
                     'query': query,
                     'response': response,
@@ -110,7 +235,7 @@ class ResponseAgent(BaseAgent):
                     'status': 'success'
                 }
             )
-            await self.send_message(response_message)
         except Exception as e:
             self.logger.error(f"Error generating response: {str(e)}")
-            await self.handle_error(e, message.trace_id)
\ No newline at end of file
+            await self.handle_error(e, message.trace_id)
+            return None
\ No newline at end of file
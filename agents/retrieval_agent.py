@@ -1,3 +1,4 @@
+import logging
 from typing import Dict, Any, List, Optional
 from core.mcp import Message, MessageType
 from agents.base_agent import BaseAgent
@@ -13,6 +14,7 @@ class RetrievalAgent(BaseAgent):
         """
         super().__init__("retrieval_agent", mcp_server)
         self.vector_store = vector_store
+        self.logger = logging.getLogger(__name__)
     def setup_handlers(self):
         """Set up message handlers for this agent"""
         self.register_handler(MessageType.RETRIEVAL_REQUEST, self.handle_retrieval_request)
@@ -21,6 +23,8 @@ class RetrievalAgent(BaseAgent):
         Handle document retrieval requests
         Args:
             message: MCP message containing retrieval request
+        Returns:
+            RETRIEVAL_RESPONSE reply with the retrieved chunks, or None on error
         """
         try:
             payload = message.payload
@@ -34,16 +38,15 @@ class RetrievalAgent(BaseAgent):
                 k=top_k,
                 filter_condition=filter_metadata
             )
-            retrieved_chunks = []
-            for result in results:
-                chunk = {
+            retrieved_chunks = [
+                {
                     "text": result["text"],
                     "score": result["score"],
                     "metadata": result["metadata"]
                 }
-                retrieved_chunks.append(chunk)
-            await self.send_message(
-                receiver_id=message.sender,
+                for result in results
+            ]
+            return message.reply(
                 message_type=MessageType.RETRIEVAL_RESPONSE,
                 payload={
                     "status": "success",
@@ -53,5 +56,6 @@ class RetrievalAgent(BaseAgent):
                 }
             )
         except Exception as e:
-            print(f"Error in retrieval agent: {e}")
-            await self.handle_error(e, message.trace_id)
\ No newline at end of file
+            self.logger.error("Error in retrieval agent: %s", e, exc_info=True)
+            await self.handle_error(e, message.trace_id)
+            return None
\ No newline at end of file
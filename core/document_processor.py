@@ -1,4 +1,5 @@
 import os
+import zipfile
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 import PyPDF2
@@ -6,9 +7,54 @@ from docx import Document
 from pptx import Presentation
 import pandas as pd
 import markdown
+import numpy as np
 from bs4 import BeautifulSoup
 import io
-from typing import List
+try:
+    import pyarrow.csv as pacsv
+except ImportError:
+    pacsv = None
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List
+_PDF_PARALLEL_THRESHOLD = 100
+try:
+    from lxml import etree as _lxml_etree
+    _BS_PARSER = 'lxml'
+except ImportError:
+    _lxml_etree = None
+    _BS_PARSER = 'html.parser'
+_DRAWINGML_NS = {'a': 'http://schemas.openxmlformats.org/drawingml/2006/main'}
+def _extract_pdf_pages(file_path: str, start: int, end: int) -> List[str]:
+    """Extract a contiguous range of PDF pages; module-level so it pickles."""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        texts = []
+        for i in range(start, end):
+            try:
+                texts.append(pdf_reader.pages[i].extract_text() or "")
+            except Exception:
+                texts.append("")
+        return texts
+def _chunk_spans(length: int, chunk_size: int, overlap: int) -> "np.ndarray":
+    """
+    Compute (start, end) index pairs for overlapping fixed-size windows.
+    The index arithmetic is vectorized in NumPy so chunking large documents
+    costs one arange instead of a per-character Python loop.
+    Args:
+        length: Total length of the text in characters
+        chunk_size: Maximum size of each chunk
+        overlap: Number of characters to overlap between chunks
+    Returns:
+        Array of shape (n_chunks, 2) with start and end offsets
+    """
+    if length <= 0:
+        return np.empty((0, 2), dtype=np.int64)
+    step = max(chunk_size - overlap, 1)
+    starts = np.arange(0, max(length - overlap, 1), step, dtype=np.int64)
+    ends = np.minimum(starts + chunk_size, length)
+    keep = np.ones(len(starts), dtype=bool)
+    keep[1:] = ends[1:] > ends[:-1]
+    return np.stack([starts[keep], ends[keep]], axis=1)
 class DocumentProcessor:
     """Processes different document formats and extracts text content"""
     @staticmethod
@@ -22,18 +68,10 @@ class DocumentProcessor:
         """
         file_extension = os.path.splitext(file_path)[1].lower()
         try:
-            if file_extension == '.pdf':
-                return DocumentProcessor._process_pdf(file_path)
-            elif file_extension == '.docx':
-                return DocumentProcessor._process_docx(file_path)
-            elif file_extension == '.pptx':
-                return DocumentProcessor._process_pptx(file_path)
-            elif file_extension == '.csv':
-                return DocumentProcessor._process_csv(file_path)
-            elif file_extension in ['.txt', '.md']:
-                return DocumentProcessor._process_text(file_path)
-            else:
+            processor = _PROCESSORS.get(file_extension)
+            if processor is None:
                 raise ValueError(f"Unsupported file format: {file_extension}")
+            return processor(file_path)
         except Exception as e:
             return {
                 "success": False,
@@ -70,91 +108,138 @@ class DocumentProcessor:
             result["metadata"] = result_metadata
         return result
     @staticmethod
+    def iter_text_parts(file_path: str) -> Iterator[str]:
+        """
+        Yield a document's text incrementally, one natural unit at a time.
+        Pages for PDFs, paragraphs for DOCX, shapes for PPTX, row blocks for
+        CSV and fixed-size blocks for plain text, so callers can chunk while
+        extraction is still running instead of buffering the whole document.
+        Args:
+            file_path: Path to the file to stream
+        Yields:
+            Text fragments in document order
+        Raises:
+            ValueError: If the file format is unsupported
+        """
+        file_extension = os.path.splitext(file_path)[1].lower()
+        if file_extension == '.pdf':
+            with open(file_path, 'rb') as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+                for page in pdf_reader.pages:
+                    yield page.extract_text() or ""
+        elif file_extension == '.docx':
+            for para in Document(file_path).paragraphs:
+                yield para.text
+        elif file_extension == '.pptx':
+            for slide in Presentation(file_path).slides:
+                for shape in slide.shapes:
+                    if hasattr(shape, "text"):
+                        yield shape.text
+        elif file_extension == '.csv':
+            for i, frame in enumerate(pd.read_csv(file_path, chunksize=1024)):
+                yield frame.to_csv(index=False, header=(i == 0))
+        elif file_extension == '.md':
+            yield DocumentProcessor._process_text(file_path).get("content", "")
+        elif file_extension == '.txt':
+            with open(file_path, 'r', encoding='utf-8') as file:
+                while block := file.read(1 << 16):
+                    yield block
+        else:
+            raise ValueError(f"Unsupported file format: {file_extension}")
+    @staticmethod
+    def chunk_stream(
+        parts: Iterator[str],
+        chunk_size: int = 1000,
+        overlap: int = 200,
+        separator: str = "\n\n"
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Chunk streamed text fragments with a rolling buffer.
+        Emits the same fixed overlapping windows as chunk_text but holds at
+        most chunk_size + one fragment in memory at a time.
+        Args:
+            parts: Iterable of text fragments in document order
+            chunk_size: Maximum size of each chunk in characters
+            overlap: Number of characters to overlap between chunks
+            separator: Text inserted between fragments
+        Yields:
+            Chunk dicts with text and position information
+        """
+        step = max(chunk_size - overlap, 1)
+        buffer = ""
+        offset = 0
+        emitted_end = 0
+        for part in parts:
+            if not part:
+                continue
+            buffer = f"{buffer}{separator}{part}" if buffer else part
+            while len(buffer) >= chunk_size:
+                yield {
+                    "text": buffer[:chunk_size],
+                    "start": offset,
+                    "end": offset + chunk_size
+                }
+                emitted_end = offset + chunk_size
+                buffer = buffer[step:]
+                offset += step
+        if buffer and (offset + len(buffer) > emitted_end or emitted_end == 0):
+            yield {
+                "text": buffer,
+                "start": offset,
+                "end": offset + len(buffer)
+            }
+    @staticmethod
     def chunk_text(
         content: str,
         chunk_size: int = 1000,
-        overlap: int = 200,
-        separator: str = "\n"
+        overlap: int = 200
     ) -> List[Dict[str, Any]]:
         """
-        Split text into chunks of specified size with overlap
+        Split text into fixed overlapping character windows
         Args:
             content: The text content to chunk
             chunk_size: Maximum size of each chunk in characters
             overlap: Number of characters to overlap between chunks
-            separator: Separator to use when splitting text
         Returns:
             List of chunks with text and position information
         """
         if not content:
             return []
-        paragraphs = content.split(separator)
-        chunks = []
-        current_chunk = []
-        current_length = 0
-        start_pos = 0
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-            para_length = len(para)
-            if current_length + para_length > chunk_size and current_chunk:
-                chunk_text = separator.join(current_chunk)
-                end_pos = start_pos + len(chunk_text)
-                chunks.append({
-                    "text": chunk_text,
-                    "start": start_pos,
-                    "end": end_pos
-                })
-                overlap_start = max(0, len(current_chunk) - overlap // (len(para) // max(1, len(current_chunk))))
-                current_chunk = current_chunk[overlap_start:]
-                current_length = len(separator.join(current_chunk))
-                start_pos = end_pos - current_length
-            current_chunk.append(para)
-            current_length += para_length + len(separator)
-        if current_chunk:
-            chunk_text = separator.join(current_chunk)
-            end_pos = start_pos + len(chunk_text)
-            chunks.append({
-                "text": chunk_text,
-                "start": start_pos,
-                "end": end_pos
-            })
-        return chunks
-class TextSplitter:
-    """Split text into chunks for processing."""
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
-        self.chunk_size = chunk_size
-        self.chunk_overlap = chunk_overlap
-    def split_text(self, text: str) -> List[str]:
-        """Split text into overlapping chunks."""
-        if not text:
-            return []
-        chunks = []
-        start = 0
-        text_length = len(text)
-        while start < text_length:
-            end = min(start + self.chunk_size, text_length)
-            chunks.append(text[start:end])
-            if end == text_length:
-                break
-            start = max(start + self.chunk_size - self.chunk_overlap, start + 1)
-        return chunks
+        return [
+            {
+                "text": content[start:end],
+                "start": int(start),
+                "end": int(end)
+            }
+            for start, end in _chunk_spans(len(content), chunk_size, overlap)
+        ]
     @staticmethod
     def _process_pdf(file_path: str) -> Dict[str, Any]:
         """Extract text from PDF file"""
-        text = ""
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n\n"
+            page_count = len(pdf_reader.pages)
+            if page_count > _PDF_PARALLEL_THRESHOLD:
+                texts = DocumentProcessor._extract_pdf_parallel(file_path, page_count)
+            else:
+                texts = [page.extract_text() or "" for page in pdf_reader.pages]
         return {
             "success": True,
-            "content": text.strip(),
+            "content": "\n\n".join(texts).strip(),
             "file_type": "pdf",
-            "page_count": len(pdf_reader.pages)
+            "page_count": page_count
         }
     @staticmethod
+    def _extract_pdf_parallel(file_path: str, page_count: int) -> List[str]:
+        """Extract pages of a large PDF across a process pool, in page order."""
+        workers = min(os.cpu_count() or 1, 8)
+        span = -(-page_count // workers)
+        ranges = [(start, min(start + span, page_count)) for start in range(0, page_count, span)]
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            parts = executor.map(_extract_pdf_pages, [file_path] * len(ranges),
+                                 [r[0] for r in ranges], [r[1] for r in ranges])
+        return [text for part in parts for text in part]
+    @staticmethod
     def _process_docx(file_path: str) -> Dict[str, Any]:
         """Extract text from DOCX file"""
         doc = Document(file_path)
@@ -169,6 +254,23 @@ class TextSplitter:
     @staticmethod
     def _process_pptx(file_path: str) -> Dict[str, Any]:
         """Extract text from PPTX file"""
+        if _lxml_etree is not None:
+            text = []
+            with zipfile.ZipFile(file_path) as archive:
+                slide_names = sorted(
+                    name for name in archive.namelist()
+                    if name.startswith('ppt/slides/slide') and name.endswith('.xml')
+                )
+                for name in slide_names:
+                    with archive.open(name) as slide_xml:
+                        tree = _lxml_etree.parse(slide_xml)
+                    text.extend(t.text or '' for t in tree.iterfind('.//a:t', _DRAWINGML_NS))
+            return {
+                "success": True,
+                "content": "\n\n".join(text).strip(),
+                "file_type": "pptx",
+                "slide_count": len(slide_names)
+            }
         prs = Presentation(file_path)
         text = []
         for slide in prs.slides:
@@ -184,8 +286,19 @@ class TextSplitter:
     @staticmethod
     def _process_csv(file_path: str) -> Dict[str, Any]:
         """Extract content from CSV file"""
+        if pacsv is not None:
+            table = pacsv.read_csv(file_path, read_options=pacsv.ReadOptions(use_threads=True))
+            buf = io.BytesIO()
+            pacsv.write_csv(table, buf)
+            return {
+                "success": True,
+                "content": buf.getvalue().decode('utf-8'),
+                "file_type": "csv",
+                "rows": table.num_rows,
+                "columns": table.column_names
+            }
         df = pd.read_csv(file_path)
-        csv_content = df.to_string(index=False)
+        csv_content = df.to_csv(index=False)
         return {
             "success": True,
             "content": csv_content,
@@ -196,17 +309,42 @@ class TextSplitter:
     @staticmethod
     def _process_text(file_path: str) -> Dict[str, Any]:
         """Extract text from TXT or MD file"""
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
+        with open(file_path, 'rb') as file:
+            content = file.read().decode('utf-8')
         if file_path.lower().endswith('.md'):
             html = markdown.markdown(content)
-            soup = BeautifulSoup(html, 'html.parser')
+            soup = BeautifulSoup(html, _BS_PARSER)
             content = soup.get_text()
         return {
             "success": True,
             "content": content.strip(),
             "file_type": "markdown" if file_path.lower().endswith('.md') else "text"
         }
+_PROCESSORS = {
+    '.pdf': DocumentProcessor._process_pdf,
+    '.docx': DocumentProcessor._process_docx,
+    '.pptx': DocumentProcessor._process_pptx,
+    '.csv': DocumentProcessor._process_csv,
+    '.txt': DocumentProcessor._process_text,
+    '.md': DocumentProcessor._process_text,
+}
+class TextSplitter:
+    """Split text into chunks for processing."""
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(
+                f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+    def split_text(self, text: str) -> List[str]:
+        """Split text into overlapping chunks."""
+        if not text:
+            return []
+        return [
+            text[start:end]
+            for start, end in _chunk_spans(len(text), self.chunk_size, self.chunk_overlap)
+        ]
     @staticmethod
     def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> List[Dict[str, Any]]:
         """
@@ -220,19 +358,12 @@ class TextSplitter:
         """
         if not text:
             return []
-        chunks = []
-        start = 0
-        text_length = len(text)
-        while start < text_length:
-            end = min(start + chunk_size, text_length)
-            chunk = text[start:end]
-            chunks.append({
-                "text": chunk,
-                "start": start,
-                "end": end,
-                "length": len(chunk)
-            })
-            if end == text_length:
-                break
-            start = end - overlap
-        return chunks
\ No newline at end of file
+        return [
+            {
+                "text": text[start:end],
+                "start": int(start),
+                "end": int(end),
+                "length": int(end - start)
+            }
+            for start, end in _chunk_spans(len(text), chunk_size, overlap)
+        ]
\ No newline at end of file
@@ -1,38 +1,148 @@
+import logging
 from typing import List, Dict, Any, Tuple
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import torch
+try:
+    import faiss
+except ImportError:
+    faiss = None
 class EmbeddingService:
     """Handles text embedding and similarity search."""
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', device: str = None):
-        """Initialize the embedding service with a pre-trained model."""
+    INITIAL_CAPACITY = 1024
+    PQ_TRAIN_SIZE = 256
+    PQ_NLIST = 64
+    PQ_NPROBE = 8
+    RERANK_TOP_K = 100
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', device: str = None, use_pq: bool = False):
+        """
+        Initialize the embedding service with a pre-trained model.
+        With use_pq=True the FAISS index is an IVF-PQ over int8 codes (built
+        once PQ_TRAIN_SIZE vectors are available) and searches rerank the top
+        candidates against the kept fp32 matrix for exact scores.
+        """
         self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name, device=self.device)
-        self.embeddings = []
+        self._compile_model()
+        self.use_pq = use_pq and faiss is not None
+        self.embeddings = None
         self.documents = []
+        self._count = 0
+        self.index = None
+    def _compile_model(self) -> None:
+        """Cast to half precision on CUDA, compile the transformer and warm it."""
+        try:
+            if self.device == 'cuda':
+                self.model = self.model.half()
+            self.model[0].auto_model = torch.compile(
+                self.model[0].auto_model, mode="reduce-overhead"
+            )
+            self.model.encode("warmup", convert_to_numpy=True)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Embedding model compile/warmup skipped: {e}")
     def embed_text(self, text: str) -> np.ndarray:
         """Convert text to embedding vector."""
         return self.model.encode(text, convert_to_numpy=True)
+    def _ensure_capacity(self, additional: int, dim: int) -> None:
+        """Grow the embedding matrix geometrically to fit additional rows."""
+        if self.embeddings is None:
+            capacity = max(self.INITIAL_CAPACITY, additional)
+            self.embeddings = np.empty((capacity, dim), dtype=np.float32)
+            return
+        needed = self._count + additional
+        if needed <= self.embeddings.shape[0]:
+            return
+        capacity = self.embeddings.shape[0]
+        while capacity < needed:
+            capacity *= 2
+        grown = np.empty((capacity, self.embeddings.shape[1]), dtype=np.float32)
+        grown[:self._count] = self.embeddings[:self._count]
+        self.embeddings = grown
     def add_document(self, text: str, metadata: Dict[str, Any] = None):
-        """Add a document to the vector store."""
-        if not text.strip():
+        """Add a single document to the vector store."""
+        self.add_documents([text], [metadata or {}])
+    def add_documents(self, texts: List[str], metadatas: List[Dict[str, Any]] = None):
+        """Add a batch of documents with one batched encode call."""
+        if metadatas is None:
+            metadatas = [{} for _ in texts]
+        kept = [(text, metadata) for text, metadata in zip(texts, metadatas) if text.strip()]
+        if not kept:
             return
-        embedding = self.embed_text(text)
-        self.embeddings.append(embedding)
-        self.documents.append({
-            'text': text,
-            'metadata': metadata or {}
-        })
+        embeddings = self.model.encode(
+            [text for text, _ in kept],
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self._ensure_capacity(len(kept), embeddings.shape[1])
+        self.embeddings[self._count:self._count + len(kept)] = embeddings
+        self._count += len(kept)
+        if faiss is None:
+            pass
+        elif self.use_pq:
+            if self.index is None:
+                if self._count >= self.PQ_TRAIN_SIZE:
+                    self._build_pq_index()
+            else:
+                self.index.add(embeddings)
+        else:
+            if self.index is None:
+                self.index = faiss.IndexHNSWFlat(embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+            self.index.add(embeddings)
+        for text, metadata in kept:
+            self.documents.append({
+                'text': text,
+                'metadata': metadata
+            })
+    def _build_pq_index(self) -> None:
+        """Train an IVF-PQ index on the accumulated vectors and add them."""
+        dim = self.embeddings.shape[1]
+        m = next(m for m in (48, 32, 16, 8, 4, 2, 1) if dim % m == 0)
+        nlist = min(self.PQ_NLIST, max(1, self._count // 39))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+        train_vectors = np.ascontiguousarray(self.embeddings[:self._count])
+        index.train(train_vectors)
+        index.add(train_vectors)
+        index.nprobe = self.PQ_NPROBE
+        self.index = index
     def search(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """Search for similar documents to the query."""
-        if not self.embeddings:
+        if not self._count:
             return []
         query_embedding = self.embed_text(query)
-        embeddings_matrix = np.array(self.embeddings)
-        similarities = np.dot(embeddings_matrix, query_embedding) / (
-            np.linalg.norm(embeddings_matrix, axis=1) * np.linalg.norm(query_embedding) + 1e-10
-        )
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
+        if self.index is not None:
+            query_vec = np.ascontiguousarray(query_embedding, dtype=np.float32)
+            query_vec = query_vec / (np.linalg.norm(query_vec) + 1e-10)
+            top_k = min(top_k, self._count)
+            if self.use_pq:
+                fetch_k = min(self.RERANK_TOP_K, self._count)
+                _, indices = self.index.search(query_vec[None, :], fetch_k)
+                candidates = indices[0][indices[0] >= 0]
+                exact = self.embeddings[candidates] @ query_vec
+                order = np.argsort(exact)[::-1][:top_k]
+                return [
+                    {**self.documents[candidates[i]], 'similarity': float(exact[i])}
+                    for i in order
+                ]
+            similarities, indices = self.index.search(query_vec[None, :], top_k)
+            results = []
+            for idx, similarity in zip(indices[0], similarities[0]):
+                if idx < 0:
+                    continue
+                doc = self.documents[idx].copy()
+                doc['similarity'] = float(similarity)
+                results.append(doc)
+            return results
+        embeddings_matrix = self.embeddings[:self._count]
+        query_vec = np.ascontiguousarray(query_embedding, dtype=np.float32)
+        query_vec /= np.linalg.norm(query_vec) + 1e-10
+        similarities = embeddings_matrix @ query_vec
+        top_k = min(top_k, self._count)
+        top_indices = np.argpartition(similarities, -top_k)[-top_k:]
+        top_indices = top_indices[np.argsort(similarities[top_indices])][::-1]
         results = []
         for idx in top_indices:
             doc = self.documents[idx].copy()
@@ -41,5 +151,7 @@ class EmbeddingService:
         return results
     def clear(self):
         """Clear all stored documents and embeddings."""
-        self.embeddings = []
-        self.documents = []
\ No newline at end of file
+        self.embeddings = None
+        self.documents = []
+        self._count = 0
+        self.index = None
@@ -0,0 +1,29 @@
+"""
+Pooled random UUID generation for hot message paths.
+uuid.uuid4() pays an os.urandom syscall and per-byte hex formatting for every
+id; message-heavy MCP traffic generates two ids per message. This module
+amortizes the entropy syscall over a 2KB per-thread buffer and formats hex
+through a precomputed byte table, while emitting standard canonical
+version-4 UUID strings.
+"""
+import os
+import threading
+_HEX = [f"{i:02x}" for i in range(256)]
+_POOL_BYTES = 2048
+_local = threading.local()
+def uuid4_hex() -> str:
+    """Return a canonical random UUID string from the pooled entropy buffer."""
+    buffer = getattr(_local, 'buffer', None)
+    pos = getattr(_local, 'pos', 0)
+    if buffer is None or pos + 16 > len(buffer):
+        buffer = _local.buffer = os.urandom(_POOL_BYTES)
+        pos = _local.pos = 0
+    raw = bytearray(buffer[pos:pos + 16])
+    _local.pos = pos + 16
+    raw[6] = (raw[6] & 0x0F) | 0x40
+    raw[8] = (raw[8] & 0x3F) | 0x80
+    hex_chars = ''.join([_HEX[b] for b in raw])
+    return (
+        f"{hex_chars[:8]}-{hex_chars[8:12]}-{hex_chars[12:16]}-"
+        f"{hex_chars[16:20]}-{hex_chars[20:]}"
+    )
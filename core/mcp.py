@@ -2,12 +2,17 @@ from __future__ import annotations
 from typing import Dict, Any, Optional, List, TypeVar, Generic, Type, Union, Callable, Awaitable, ClassVar
 from pydantic import BaseModel, Field, validator
 from enum import Enum, auto
+from functools import lru_cache
 from uuid import uuid4, UUID
+from .fastuuid import uuid4_hex
+import asyncio
 import datetime
 import logging
+import sys
+import time
 from dataclasses import dataclass
 from pathlib import Path
-import json
+import orjson
 T = TypeVar('T')
 MessageHandler = Callable[['Message'], Awaitable[Optional['Message']]]
 MessageTypeValue = Union['MessageType', str]
@@ -43,6 +48,7 @@ class MessageType(str, Enum):
     SYSTEM_SHUTDOWN = "SYSTEM_SHUTDOWN"
     SYSTEM_HEALTH_CHECK = "SYSTEM_HEALTH_CHECK"
     @classmethod
+    @lru_cache(maxsize=256)
     def is_valid(cls, value: Union['MessageType', str]) -> bool:
         """
         Check if a value is a valid MessageType.
@@ -59,6 +65,7 @@ class MessageType(str, Enum):
         except ValueError:
             return False
     @classmethod
+    @lru_cache(maxsize=256)
     def normalize(cls, value: Union['MessageType', str]) -> 'MessageType':
         """
         Convert a string to a MessageType if possible.
@@ -75,6 +82,39 @@ class MessageType(str, Enum):
             return cls(value.upper())
         except ValueError as e:
             raise ValueError(f"Invalid MessageType: {value}") from e
+_META_CACHE: Dict[int, tuple] = {}
+_META_CACHE_MAX = 256
+def _meta_bytes(metadata: Dict[str, Any]) -> bytes:
+    """
+    Serialize a metadata dict, reusing cached bytes for repeated templates.
+    Entries pin the dict they serialized, so a hit is only returned for the
+    identical object; shared metadata templates must be treated as immutable
+    once a message carrying them has been serialized.
+    """
+    key = id(metadata)
+    entry = _META_CACHE.get(key)
+    if entry is not None and entry[0] is metadata:
+        return entry[1]
+    data = orjson.dumps(metadata, default=str)
+    if len(_META_CACHE) >= _META_CACHE_MAX:
+        _META_CACHE.clear()
+    _META_CACHE[key] = (metadata, data)
+    return data
+_NOW_CACHE = [datetime.datetime.utcnow(), 0]
+def _cached_utcnow() -> datetime.datetime:
+    """Return a UTC datetime refreshed at most once per millisecond."""
+    now = time.time_ns()
+    if now - _NOW_CACHE[1] > 1_000_000:
+        _NOW_CACHE[0] = datetime.datetime.utcnow()
+        _NOW_CACHE[1] = now
+    return _NOW_CACHE[0]
+_RESPONSE_TYPE_MAP: Dict[str, Union[MessageType, str]] = {}
+for _mt in MessageType:
+    _response_name = f"{_mt.value}_RESPONSE"
+    try:
+        _RESPONSE_TYPE_MAP[_mt.value] = MessageType(_response_name)
+    except ValueError:
+        _RESPONSE_TYPE_MAP[_mt.value] = _response_name
 class Message(BaseModel):
     """
     Base message class for Model-Controller-Protocol (MCP) communication.
@@ -82,11 +122,11 @@ class Message(BaseModel):
     of the system, such as agents, services, or external systems.
     """
     message_id: str = Field(
-        default_factory=lambda: str(uuid4()),
+        default_factory=uuid4_hex,
         description="Unique identifier for this message"
     )
     trace_id: str = Field(
-        default_factory=lambda: str(uuid4()),
+        default_factory=uuid4_hex,
         description="Correlation ID for tracing requests across services"
     )
     message_type: Union[MessageType, str] = Field(
@@ -102,7 +142,7 @@ class Message(BaseModel):
         description="ID of the intended recipient component"
     )
     timestamp: datetime.datetime = Field(
-        default_factory=datetime.datetime.utcnow,
+        default_factory=_cached_utcnow,
         description="When the message was created"
     )
     payload: Dict[str, Any] = Field(
@@ -113,12 +153,9 @@ class Message(BaseModel):
         default_factory=dict,
         description="Additional context or metadata about the message"
     )
+    _pool: ClassVar[List['Message']] = []
+    _POOL_MAX: ClassVar[int] = 256
     class Config:
-        json_encoders = {
-            datetime.datetime: lambda v: v.isoformat(),
-            UUID: str,
-            Path: str,
-        }
         arbitrary_types_allowed = True
         use_enum_values = True
     @validator('message_type', pre=True)
@@ -154,15 +191,70 @@ class Message(BaseModel):
         Returns:
             A new Message instance
         """
-        return cls(
+        if isinstance(message_type, MessageType):
+            message_type = message_type.value
+        else:
+            try:
+                message_type = MessageType(message_type.upper()).value
+            except (ValueError, AttributeError):
+                pass
+        return cls.construct(
+            message_id=uuid4_hex(),
+            trace_id=trace_id or uuid4_hex(),
             message_type=message_type,
             sender=sender,
             receiver=receiver,
+            timestamp=_cached_utcnow(),
             payload=payload or {},
             metadata=metadata or {},
-            trace_id=trace_id or str(uuid4()),
             **extra
         )
+    @classmethod
+    def acquire(
+        cls,
+        message_type: Union[MessageType, str],
+        sender: str,
+        receiver: str,
+        payload: Optional[Dict[str, Any]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        trace_id: Optional[str] = None
+    ) -> 'Message':
+        """
+        Get a message from the free-list, or create one.
+        Reused shells are reinitialized with object.__setattr__, skipping
+        validation, so callers must pass already-well-formed fields. Only
+        release() messages that no other component still references — handlers
+        that stash the message (history, outbox queues) must not release it.
+        """
+        if not cls._pool:
+            return cls.create(
+                message_type=message_type,
+                sender=sender,
+                receiver=receiver,
+                payload=payload,
+                metadata=metadata,
+                trace_id=trace_id
+            )
+        message = cls._pool.pop()
+        object.__setattr__(message, 'message_id', uuid4_hex())
+        object.__setattr__(message, 'trace_id', trace_id or uuid4_hex())
+        object.__setattr__(
+            message, 'message_type',
+            message_type.value if isinstance(message_type, MessageType) else message_type
+        )
+        object.__setattr__(message, 'sender', sender)
+        object.__setattr__(message, 'receiver', receiver)
+        object.__setattr__(message, 'timestamp', _cached_utcnow())
+        object.__setattr__(message, 'payload', payload if payload is not None else {})
+        object.__setattr__(message, 'metadata', metadata if metadata is not None else {})
+        return message
+    @classmethod
+    def release(cls, message: 'Message') -> None:
+        """Return a message shell to the free-list for reuse by acquire()."""
+        if len(cls._pool) < cls._POOL_MAX:
+            object.__setattr__(message, 'payload', {})
+            object.__setattr__(message, 'metadata', {})
+            cls._pool.append(message)
     def reply(
         self,
         message_type: Optional[Union[MessageType, str]] = None,
@@ -179,10 +271,8 @@ class Message(BaseModel):
             A new Message that is a reply to this one
         """
         if message_type is None:
-            try:
-                message_type = MessageType(f"{self.message_type}_RESPONSE")
-            except ValueError:
-                message_type = f"{self.message_type}_RESPONSE"
+            key = str(self.message_type)
+            message_type = _RESPONSE_TYPE_MAP.get(key, f"{key}_RESPONSE")
         return self.create(
             message_type=message_type,
             sender=self.receiver,
@@ -196,15 +286,32 @@ class Message(BaseModel):
         return self.dict()
     def to_json(self) -> str:
         """Serialize message to JSON string"""
-        return self.json()
+        return orjson.dumps(self.dict(), default=str).decode('utf-8')
+    def to_bytes(self) -> bytes:
+        """
+        Serialize message to compact JSON bytes for the wire.
+        Assembles the payload dict straight from the field attributes, skipping
+        Pydantic's dict() field walk and copy on the routing hot path.
+        """
+        message_type = self.message_type
+        return orjson.dumps({
+            'message_id': self.message_id,
+            'trace_id': self.trace_id,
+            'message_type': message_type.value if isinstance(message_type, MessageType) else message_type,
+            'sender': self.sender,
+            'receiver': self.receiver,
+            'timestamp': self.timestamp,
+            'payload': self.payload,
+            'metadata': orjson.Fragment(_meta_bytes(self.metadata))
+        }, default=str)
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Message':
         """Create message from dictionary"""
         return cls.parse_obj(data)
     @classmethod
-    def from_json(cls, json_str: str) -> 'Message':
-        """Create message from JSON string"""
-        return cls.parse_raw(json_str)
+    def from_json(cls, json_str: Union[str, bytes]) -> 'Message':
+        """Create message from a JSON string or bytes"""
+        return cls.parse_obj(orjson.loads(json_str))
 class MCPClient:
     """
     Base MCP client for sending and receiving messages.
@@ -223,6 +330,7 @@ class MCPClient:
         self._message_handlers = {}
         self._default_handler = None
         self._logger = logging.getLogger(f"{self.__class__.__name__}:{self.client_id}")
+        self._debug_enabled = self._logger.isEnabledFor(logging.DEBUG)
         self._server = None
     @property
     def server(self) -> Optional['MCPServer']:
@@ -244,15 +352,17 @@ class MCPClient:
             handler: The async function to call when a message of this type is received.
                    If None, the handler will be unregistered.
         """
-        if isinstance(message_type, str):
+        if isinstance(message_type, MessageType):
+            key = message_type.value
+        else:
             try:
-                message_type = MessageType(message_type.upper())
+                key = MessageType(message_type.upper()).value
             except ValueError:
-                pass
+                key = message_type
         if handler is None:
-            self._message_handlers.pop(message_type, None)
+            self._message_handlers.pop(key, None)
         else:
-            self._message_handlers[message_type] = handler
+            self._message_handlers[key] = handler
     def register_default_handler(self, handler: Callable[[Message], Awaitable[Optional[Message]]]) -> None:
         """
         Register a default handler for messages that don't have a specific handler.
@@ -291,14 +401,15 @@ class MCPClient:
             raise ValueError("Message must be a Message instance or a dictionary")
         if not message.sender:
             message.sender = self.client_id
-        self._logger.debug(
-            f"Sending message: {message.message_type} from {message.sender} to {message.receiver}",
-            extra={
-                "message_id": message.message_id,
-                "trace_id": message.trace_id,
-                "message_type": str(message.message_type)
-            }
-        )
+        if self._debug_enabled:
+            self._logger.debug(
+                f"Sending message: {message.message_type} from {message.sender} to {message.receiver}",
+                extra={
+                    "message_id": message.message_id,
+                    "trace_id": message.trace_id,
+                    "message_type": str(message.message_type)
+                }
+            )
         if self._server:
             return await self._server.route_message(message)
         if message.receiver == self.client_id:
@@ -312,15 +423,18 @@ class MCPClient:
         Returns:
             Optional response message.
         """
-        self._logger.debug(
-            f"Received message: {message.message_type} from {message.sender}",
-            extra={
-                "message_id": message.message_id,
-                "trace_id": message.trace_id,
-                "message_type": str(message.message_type)
-            }
-        )
-        handler = self._message_handlers.get(message.message_type, self._default_handler)
+        if self._debug_enabled:
+            self._logger.debug(
+                f"Received message: {message.message_type} from {message.sender}",
+                extra={
+                    "message_id": message.message_id,
+                    "trace_id": message.trace_id,
+                    "message_type": str(message.message_type)
+                }
+            )
+        message_type = message.message_type
+        key = message_type.value if isinstance(message_type, MessageType) else message_type
+        handler = self._message_handlers.get(key, self._default_handler)
         if handler:
             try:
                 return await handler(message)
@@ -360,11 +474,13 @@ class MCPServer:
     def __init__(self):
         """Initialize the MCP server."""
         self._clients = {}
+        self._client_ids = ()
         self._logger = logging.getLogger(self.__class__.__name__)
+        self._debug_enabled = self._logger.isEnabledFor(logging.DEBUG)
     @property
-    def client_ids(self) -> List[str]:
-        """Get a list of all registered client IDs."""
-        return list(self._clients.keys())
+    def client_ids(self) -> tuple:
+        """Get a snapshot of all registered client IDs."""
+        return self._client_ids
     def register_client(self, client_id: str, client: MCPClient) -> None:
         """
         Register a client with the server.
@@ -376,7 +492,8 @@ class MCPServer:
         """
         if client_id in self._clients:
             raise ValueError(f"Client ID already registered: {client_id}")
-        self._clients[client_id] = client
+        self._clients[sys.intern(client_id)] = client
+        self._client_ids = tuple(self._clients.keys())
         client.server = self
         self._logger.info(f"Registered client: {client_id}")
     def unregister_client(self, client_id: str) -> None:
@@ -388,6 +505,7 @@ class MCPServer:
         if client_id in self._clients:
             self._clients[client_id].server = None
             del self._clients[client_id]
+            self._client_ids = tuple(self._clients.keys())
             self._logger.info(f"Unregistered client: {client_id}")
     async def route_message(self, message: Message) -> Optional[Message]:
         """
@@ -401,40 +519,65 @@ class MCPServer:
         """
         if not isinstance(message, Message):
             raise ValueError("Message must be a Message instance")
-        self._logger.debug(
-            f"Routing message: {message.message_type} from {message.sender} to {message.receiver}",
-            extra={
-                "message_id": message.message_id,
-                "trace_id": message.trace_id,
-                "message_type": str(message.message_type)
-            }
-        )
-        if message.receiver not in self._clients:
+        if self._debug_enabled:
+            self._logger.debug(
+                f"Routing message: {message.message_type} from {message.sender} to {message.receiver}",
+                extra={
+                    "message_id": message.message_id,
+                    "trace_id": message.trace_id,
+                    "message_type": str(message.message_type)
+                }
+            )
+        recipient = self._clients.get(message.receiver)
+        if recipient is None:
             error_msg = f"No client registered with ID: {message.receiver}"
             self._logger.error(error_msg)
             raise ValueError(error_msg)
-        recipient = self._clients[message.receiver]
         return await recipient.receive_message(message)
-    async def broadcast(self, message: Message, exclude_sender: bool = True) -> List[Message]:
+    async def route_batch(self, messages: List[Message]) -> List[Message]:
         """
-        Broadcast a message to all connected clients.
+        Route a batch of messages, collecting any responses.
         Args:
-            message: The message to broadcast.
-            exclude_sender: If True, don't send the message back to the sender.
+            messages: The messages to route, in order.
         Returns:
             List of response messages from recipients.
         """
         responses = []
-        for client_id, client in self._clients.items():
-            if exclude_sender and client_id == message.sender:
-                continue
+        for message in messages:
             try:
-                response = await client.receive_message(message)
+                response = await self.route_message(message)
                 if response:
                     responses.append(response)
             except Exception as e:
                 self._logger.error(
-                    f"Error broadcasting to {client_id}: {e}",
+                    f"Error routing batched message to {message.receiver}: {e}",
                     exc_info=True
                 )
+        return responses
+    async def broadcast(self, message: Message, exclude_sender: bool = True) -> List[Message]:
+        """
+        Broadcast a message to all connected clients.
+        Args:
+            message: The message to broadcast.
+            exclude_sender: If True, don't send the message back to the sender.
+        Returns:
+            List of response messages from recipients.
+        """
+        targets = [
+            (client_id, client) for client_id, client in self._clients.items()
+            if not (exclude_sender and client_id == message.sender)
+        ]
+        results = await asyncio.gather(
+            *(client.receive_message(message) for _, client in targets),
+            return_exceptions=True
+        )
+        responses = []
+        for (client_id, _), result in zip(targets, results):
+            if isinstance(result, BaseException):
+                self._logger.error(
+                    f"Error broadcasting to {client_id}: {result}",
+                    exc_info=result
+                )
+            elif result:
+                responses.append(result)
         return responses
\ No newline at end of file
@@ -47,6 +47,7 @@ class MessageRouter:
         """
         self._handlers: Dict[Union[MessageType, str], MessageHandlerInfo] = {}
         self._default_handler: Optional[MessageHandler] = None
+        self._compiled: Optional[Callable[[Message], Any]] = None
         self.logger = logger or logging.getLogger(__name__)
     def register(
         self, 
@@ -68,7 +69,8 @@ class MessageRouter:
                 signature = inspect.signature(handler)
             except (ValueError, TypeError):
                 signature = None
-            self._handlers[message_type] = MessageHandlerInfo(
+            key = message_type.value if isinstance(message_type, MessageType) else message_type
+            self._handlers[key] = MessageHandlerInfo(
                 message_type=message_type,
                 handler=handler,
                 is_async=is_async,
@@ -80,8 +82,38 @@ class MessageRouter:
                 f"Registered handler for message type: {message_type}",
                 extra={"handler": handler.__name__, "is_async": is_async}
             )
+            self._recompile()
             return handler
         return decorator
+    def _recompile(self) -> None:
+        """
+        Regenerate the specialized dispatch function for the current handlers.
+        For a fixed set of async handlers a generated if/elif chain over
+        interned string comparisons beats the dict lookup; routers with sync
+        handlers (which need the executor path) keep the generic dispatch.
+        """
+        self._compiled = None
+        if not self._handlers:
+            return
+        if any(not info.is_async for info in self._handlers.values()):
+            return
+        if self._default_handler is not None and not asyncio.iscoroutinefunction(self._default_handler):
+            return
+        env = {'_default': self._default_handler}
+        lines = [
+            "def _dispatch(message):",
+            "    mt = message.message_type",
+            "    if not isinstance(mt, str):",
+            "        mt = mt.value",
+        ]
+        for i, (key, info) in enumerate(self._handlers.items()):
+            env[f"_h{i}"] = info.handler
+            branch = "if" if i == 0 else "elif"
+            lines.append(f"    {branch} mt == {str(key)!r}:")
+            lines.append(f"        return _h{i}(message)")
+        lines.append("    return _default(message) if _default is not None else None")
+        exec("\n".join(lines), env)
+        self._compiled = env['_dispatch']
     def register_default(self, handler: MessageHandler) -> MessageHandler:
         """
         Register a default handler for messages that don't have a specific handler.
@@ -95,6 +127,7 @@ class MessageRouter:
             f"Registered default message handler: {handler.__name__}",
             extra={"is_async": asyncio.iscoroutinefunction(handler)}
         )
+        self._recompile()
         return handler
     async def handle_message(self, message: Message) -> Optional[Message]:
         """
@@ -106,7 +139,32 @@ class MessageRouter:
         """
         if not isinstance(message, Message):
             raise ValueError("Message must be an instance of Message")
-        handler_info = self._handlers.get(message.message_type)
+        if self._compiled is not None:
+            coro = self._compiled(message)
+            if coro is not None:
+                try:
+                    return await coro
+                except Exception as e:
+                    self.logger.error(
+                        f"Error in message handler for {message.message_type}: {e}",
+                        exc_info=True,
+                        extra={
+                            "message_id": message.message_id,
+                            "trace_id": message.trace_id
+                        }
+                    )
+                    raise
+            self.logger.warning(
+                f"No handler registered for message type: {message.message_type}",
+                extra={
+                    "message_id": message.message_id,
+                    "trace_id": message.trace_id
+                }
+            )
+            return None
+        message_type = message.message_type
+        key = message_type.value if isinstance(message_type, MessageType) else message_type
+        handler_info = self._handlers.get(key)
         if handler_info:
             try:
                 self.logger.debug(
@@ -164,7 +222,8 @@ class MessageRouter:
         Returns:
             Information about the handler, or None if not found.
         """
-        return self._handlers.get(message_type)
+        key = message_type.value if isinstance(message_type, MessageType) else message_type
+        return self._handlers.get(key)
     def list_handlers(self) -> List[MessageHandlerInfo]:
         """
         Get a list of all registered handlers.
@@ -176,4 +235,5 @@ class MessageRouter:
         """Clear all registered handlers."""
         self._handlers.clear()
         self._default_handler = None
+        self._compiled = None
         self.logger.debug("Cleared all message handlers")
\ No newline at end of file
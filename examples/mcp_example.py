@@ -6,9 +6,11 @@ that can communicate with each other using the MCP message passing system.
 import asyncio
 import logging
 import sys
+from datetime import datetime
 from typing import Dict, Optional, Any
 import sys
 from pathlib import Path
+_now = datetime.utcnow
 sys.path.append(str(Path(__file__).parent.parent))
 from core import (
     MCPServer,
@@ -32,7 +34,7 @@ class ChatClient(MCPClient):
         self.setup_handlers()
     def setup_handlers(self):
         """Set up message handlers for this client."""
-        @self.router.register(MessageType("CHAT_MESSAGE"))
+        @self.router.register("CHAT_MESSAGE")
         async def handle_chat_message(message: Message) -> Optional[Message]:
             if message.sender == self.client_id:
                 return None
@@ -40,7 +42,7 @@ class ChatClient(MCPClient):
                   f"{message.payload.get('content', '')}")
             print("> ", end="", flush=True)
             return None
-        @self.router.register(MessageType("SYSTEM_MESSAGE"))
+        @self.router.register("SYSTEM_MESSAGE")
         async def handle_system_message(message: Message) -> Optional[Message]:
             print(f"\n[SYSTEM] {message.payload.get('content', '')}")
             print("> ", end="", flush=True)
@@ -57,14 +59,14 @@ class ChatClient(MCPClient):
             payload={
                 "sender": self.username,
                 "content": content,
-                "timestamp": str(datetime.datetime.now())
+                "timestamp": _now().isoformat()
             }
         )
         if recipient:
             await self.send_message(message)
             print(f"[You -> {recipient}]: {content}")
         else:
-            await self.send_message(message)
+            await self.server.broadcast(message)
             print(f"[You -> Everyone]: {content}")
 async def run_chat_client(server: MCPServer, username: str):
     """Run a chat client in the console."""
@@ -84,10 +86,11 @@ async def run_chat_client(server: MCPServer, username: str):
     print(f"\nWelcome to the chat, {username}! Type '/quit' to exit.")
     print("To send a private message, use: @username your message")
     print("To broadcast to everyone, just type your message\n")
+    loop = asyncio.get_running_loop()
     try:
         while True:
             try:
-                text = input("> ").strip()
+                text = (await loop.run_in_executor(None, input, "> ")).strip()
             except (EOFError, KeyboardInterrupt):
                 break
             if text.lower() == '/quit':
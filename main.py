@@ -1,27 +1,65 @@
+import aiofiles
+import datetime
+import httpx
 import os
 import uvicorn
 import logging
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request, status
-from fastapi.responses import JSONResponse, HTMLResponse
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    uvloop = None
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-import shutil
-import uuid
+from collections import OrderedDict
+import hashlib
+import numpy as np
+try:
+    import faiss
+except ImportError:
+    faiss = None
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
 import asyncio
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the heavy services and agents once the server process starts."""
+    global document_processor, embedding_service, vector_store
+    document_processor = DocumentProcessor()
+    logger.info(f"Initializing VectorStore with model: {model_name}")
+    inner_embedding_service, vector_store = await asyncio.gather(
+        asyncio.to_thread(EmbeddingService),
+        asyncio.to_thread(VectorStore, model_name)
+    )
+    embedding_service = CachedEmbeddingService(inner_embedding_service)
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=200),
+        timeout=30.0
+    )
+    await asyncio.to_thread(embedding_service.embed_text, "health check")
+    await startup_event()
+    yield
+    await app.state.http.aclose()
 app = FastAPI(
     title="Agentic RAG Chatbot",
     description="A Retrieval-Augmented Generation chatbot with modular agents",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 from core.document_processor import DocumentProcessor, TextSplitter
 from core.embedding_service import EmbeddingService
 from storage.vector_store import VectorStore
+from core.fastuuid import uuid4_hex
 from core.mcp import MCPServer, Message, MessageType
+from storage.embedding_cache import EmbeddingCache
 from agents import (
     IngestionAgent, 
     RetrievalAgent, 
@@ -31,11 +69,55 @@ from agents import (
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 logger.info(f"Upload directory set to: {UPLOAD_DIR}")
-document_processor = DocumentProcessor()
-embedding_service = EmbeddingService()
+class CachedEmbeddingService:
+    """
+    Read-through embedding cache keyed by a hash of the input text.
+    Misses fall through to a SQLite-backed cache shared across restarts and
+    workers, so a warm corpus survives process recycling.
+    """
+    def __init__(self, inner: EmbeddingService, capacity: int = 10000, cache_dir: str = "./cache"):
+        self._inner = inner
+        self._cache = OrderedDict()
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self._disk = EmbeddingCache(
+            Path(cache_dir) / "embeddings.db",
+            model=getattr(inner, "model_name", "unknown")
+        )
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+    def _remember(self, key: bytes, vector):
+        self._cache[key] = vector
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+    def embed_text(self, text: str):
+        key = hashlib.sha256(text.encode('utf-8')).digest()
+        vector = self._cache.get(key)
+        if vector is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return vector
+        cached = self._disk.get(text)
+        if cached is not None:
+            self.hits += 1
+            vector = np.asarray(cached, dtype=np.float32)
+            self._remember(key, vector)
+            return vector
+        self.misses += 1
+        vector = self._inner.embed_text(text)
+        self._disk.put_many([text], [np.asarray(vector, dtype=np.float32)])
+        self._remember(key, vector)
+        return vector
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+document_processor = None
+embedding_service = None
 model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-logger.info(f"Initializing VectorStore with model: {model_name}")
-vector_store = VectorStore(model_name=model_name)  
+vector_store = None
 mcp_server = MCPServer()
 global mcp_server_global
 mcp_server_global = mcp_server
@@ -46,40 +128,133 @@ agent_instances = {
     'response_agent': ResponseAgent,
 }
 coordinator_global = None
-@app.on_event("startup")
+def _register_agent(agent_id: str, agent_class, existing: set, **deps):
+    """
+    Construct an agent unless one is already registered under its id.
+    Agents register themselves with the MCP server in their constructor, so
+    construction is skipped entirely for ids in the existing snapshot.
+    """
+    if agent_id in existing:
+        logger.info("Agent %s is already registered", agent_id)
+        return mcp_server._clients[agent_id]
+    agent = agent_class(mcp_server=mcp_server, **deps)
+    logger.info("Registered agent: %s", agent_id)
+    return agent
 async def startup_event():
     global coordinator_global
     try:
+        existing = set(mcp_server.client_ids)
+        built = {}
         for agent_id, agent_class in agent_instances.items():
-            try:
-                if agent_id in ['ingestion_agent', 'retrieval_agent']:
-                    agent = agent_class(mcp_server=mcp_server, vector_store=vector_store)
-                else:
-                    agent = agent_class(mcp_server=mcp_server)
-                if agent_id not in mcp_server._clients:
-                    mcp_server.register_client(agent_id, agent)
-                    agents[agent_id] = agent
-                    logger.info(f"Registered agent: {agent_id}")
-                else:
-                    logger.info(f"Agent {agent_id} is already registered")
-                    agents[agent_id] = mcp_server._clients[agent_id]
-            except Exception as e:
-                logger.error(f"Error initializing agent {agent_id}: {str(e)}", exc_info=True)
-                raise
-        coordinator = CoordinatorAgent(mcp_server=mcp_server, agents=agents)
-        if 'coordinator' not in mcp_server._clients:
+            deps = {"vector_store": vector_store} if agent_id in ('ingestion_agent', 'retrieval_agent') else {}
+            built[agent_id] = _register_agent(agent_id, agent_class, existing, **deps)
+        agents.update(built)
+        coordinator = _register_agent('coordinator_agent', CoordinatorAgent, existing, agents=agents)
+        if 'coordinator' not in existing and 'coordinator' not in mcp_server.client_ids:
             mcp_server.register_client('coordinator', coordinator)
-            logger.info("Registered coordinator agent")
-        else:
-            logger.info("Coordinator agent is already registered")
-            coordinator = mcp_server._clients['coordinator']
         coordinator_global = coordinator
         logger.info("Coordinator initialized successfully")
     except Exception as e:
-        logger.error(f"Error initializing coordinator: {str(e)}", exc_info=True)
+        logger.error(f"Error initializing agents: {str(e)}", exc_info=True)
         raise
-app.mount("/static", StaticFiles(directory="static"), name="static")
+class CachedStaticFiles(StaticFiles):
+    """Static file app that lets browsers cache assets for an hour."""
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers.setdefault("Cache-Control", "public, max-age=3600")
+        return response
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
+class SemanticCache:
+    """
+    LRU cache of chat responses keyed by query embedding similarity.
+    Lookups go through a FAISS HNSW index when faiss is installed; evicted
+    and expired rows linger in the index until the periodic rebuild, so hits
+    are validated against the live entry table before being served.
+    """
+    def __init__(self, capacity: int = 1000, ttl: float = 300.0, threshold: float = 0.95):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._index = None
+        self._index_keys = []
+    def _rebuild_index(self) -> None:
+        """Rebuild the ANN index from the live entries."""
+        self._index = None
+        self._index_keys = []
+        if faiss is None or not self._entries:
+            return
+        vectors = np.stack([vec for vec, _, _ in self._entries.values()]).astype(np.float32)
+        self._index = faiss.IndexHNSWFlat(vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        self._index.add(np.ascontiguousarray(vectors))
+        self._index_keys = list(self._entries.keys())
+    def _entry_if_live(self, key: str) -> Optional[str]:
+        """Return the cached response if the entry exists and hasn't expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        _, response, ts = entry
+        if time.monotonic() - ts > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+    def get(self, query_vec: "np.ndarray") -> Optional[str]:
+        """Return a cached response whose query is semantically close enough."""
+        if not self._entries:
+            return None
+        query_vec = np.ascontiguousarray(query_vec, dtype=np.float32)
+        query_vec = query_vec / (np.linalg.norm(query_vec) + 1e-10)
+        if self._index is not None:
+            k = min(3, self._index.ntotal)
+            similarities, indices = self._index.search(query_vec[None, :], k)
+            for idx, similarity in zip(indices[0], similarities[0]):
+                if idx < 0 or similarity < self.threshold:
+                    continue
+                response = self._entry_if_live(self._index_keys[idx])
+                if response is not None:
+                    return response
+            return None
+        now = time.monotonic()
+        keys = []
+        vectors = []
+        for key, (vec, _, ts) in list(self._entries.items()):
+            if now - ts > self.ttl:
+                del self._entries[key]
+                continue
+            keys.append(key)
+            vectors.append(vec)
+        if not vectors:
+            return None
+        similarities = np.stack(vectors) @ query_vec
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]][1]
+        return None
+    def clear(self) -> None:
+        """Drop all cached responses, e.g. after the corpus changed."""
+        self._entries.clear()
+        self._index = None
+        self._index_keys = []
+    def put(self, key: str, query_vec: "np.ndarray", response: str) -> None:
+        """Insert a response, evicting the least recently used entry."""
+        query_vec = np.ascontiguousarray(query_vec, dtype=np.float32)
+        query_vec = query_vec / (np.linalg.norm(query_vec) + 1e-10)
+        self._entries[key] = (query_vec, response, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        if faiss is None:
+            return
+        if self._index is None or len(self._index_keys) > 2 * len(self._entries):
+            self._rebuild_index()
+        else:
+            self._index.add(query_vec[None, :])
+            self._index_keys.append(key)
+semantic_cache = SemanticCache()
 class ChatMessage(BaseModel):
     """Model for chat message input"""
     message: str
@@ -90,7 +265,15 @@ class UploadResponse(BaseModel):
     file_id: Optional[str] = None
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    cached = getattr(app.state, "index_html", None)
+    if cached is None:
+        html = templates.get_template("index.html").render(request=request)
+        cached = (html, hashlib.md5(html.encode("utf-8")).hexdigest())
+        app.state.index_html = cached
+    html, etag = cached
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    return HTMLResponse(html, headers={"ETag": etag, "Cache-Control": "public, max-age=60"})
 @app.post("/api/chat", response_model=Dict[str, Any])
 async def chat(chat_message: ChatMessage):
     """
@@ -101,16 +284,27 @@ async def chat(chat_message: ChatMessage):
         JSON response with the assistant's reply
     """
     try:
-        logger.info(f"Received chat request: {chat_message.message}")
-        trace_id = str(uuid.uuid4())
-        logger.debug(f"Sending message to coordinator with trace_id: {trace_id}")
+        logger.info("Received chat request: %s", chat_message.message)
+        trace_id = uuid4_hex()
+        conversation_id = chat_message.conversation_id or uuid4_hex()
+        query_vec = await asyncio.to_thread(embedding_service.embed_text, chat_message.message)
+        cached_response = semantic_cache.get(query_vec)
+        if cached_response is not None:
+            logger.info("Semantic cache hit for trace_id: %s", trace_id)
+            return {
+                "response": cached_response,
+                "conversation_id": conversation_id,
+                "trace_id": trace_id,
+                "cached": True
+            }
+        logger.debug("Sending message to coordinator with trace_id: %s", trace_id)
         try:
-            response = await coordinator.send_message(
+            response = await coordinator_global.send_message(
                 receiver_id="coordinator_agent",
                 message_type=MessageType.LLM_REQUEST,  
                 payload={
                     "query": chat_message.message,
-                    "conversation_id": chat_message.conversation_id or str(uuid.uuid4()),
+                    "conversation_id": conversation_id,
                     "trace_id": trace_id
                 }
             )
@@ -141,10 +335,11 @@ async def chat(chat_message: ChatMessage):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Invalid response format from the server"
             )
-        logger.info(f"Successfully generated response for trace_id: {trace_id}")
+        logger.info("Successfully generated response for trace_id: %s", trace_id)
+        semantic_cache.put(chat_message.message, query_vec, response.payload.get("response", ""))
         return {
             "response": response.payload.get("response", "No response generated"),
-            "conversation_id": chat_message.conversation_id or str(uuid.uuid4()),
+            "conversation_id": conversation_id,
             "trace_id": trace_id
         }
     except HTTPException as http_exc:
@@ -160,70 +355,60 @@ coordinator_global = None
 async def upload_file(file: UploadFile = File(...)):
     global coordinator_global
     try:
-        logger.info(f"Starting file upload for {file.filename}")
+        logger.info("Starting file upload for %s", file.filename)
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file selected")
-        file_id = str(uuid.uuid4())
+        file_id = uuid4_hex()
         file_extension = os.path.splitext(file.filename)[1]
         if not file_extension:
             file_extension = ".bin"  
         file_path = os.path.join(UPLOAD_DIR, f"{file_id}{file_extension}")
         try:
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            logger.info(f"File saved to {file_path} (size: {os.path.getsize(file_path)} bytes)")
+            async with aiofiles.open(file_path, "wb") as buffer:
+                while chunk := await file.read(4 << 20):
+                    await buffer.write(chunk)
+            logger.info("File saved to %s (size: %d bytes)", file_path, os.path.getsize(file_path))
         except Exception as e:
             logger.error(f"Error saving file: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to save file: {str(e)}"
             )
-        trace_id = str(uuid.uuid4())
-        logger.info(f"Processing file upload with trace_id: {trace_id}")
-        try:
-            if not coordinator_global:
-                logger.error("Coordinator not available for file upload")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Coordinator service is not available. Please try again later."
-                )
-            message = Message(
-                sender="api",
-                receiver="ingestion_agent",
-                message_type=MessageType.INGESTION_REQUEST,
-                trace_id=trace_id,
-                payload={
-                    "file_path": file_path,
-                    "metadata": {
-                        "filename": file.filename,
-                        "content_type": file.content_type,
-                        "source": file.filename,
-                        "trace_id": trace_id
-                    }
-                }
+        trace_id = uuid4_hex()
+        logger.info("Processing file upload with trace_id: %s", trace_id)
+        if not coordinator_global:
+            logger.error("Coordinator not available for file upload")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Coordinator service is not available. Please try again later."
             )
-            logger.debug(f"Sending message to coordinator: {message}")
-            response = await mcp_server_global.route_message(message)
-            if not response or response.message_type == MessageType.ERROR:
-                error_msg = response.get("payload", {}).get("error", "Error processing file") if response else "No response from coordinator"
-                logger.error(f"Error processing file upload {trace_id}: {error_msg}")
-                raise HTTPException(status_code=400, detail=error_msg)
-            logger.info(f"File processed successfully: {file.filename}")
-            return {
-                "status": "success",
-                "message": "File uploaded and processed successfully",
+        message = Message(
+            sender="api",
+            receiver="ingestion_agent",
+            message_type=MessageType.INGESTION_REQUEST,
+            trace_id=trace_id,
+            payload={
+                "file_path": file_path,
+                "metadata": {
+                    "filename": file.filename,
+                    "content_type": file.content_type,
+                    "source": file.filename,
+                    "trace_id": trace_id
+                }
+            }
+        )
+        _record_job(trace_id, status="processing", file_id=file_id, filename=file.filename)
+        asyncio.create_task(_process_ingestion(trace_id, message))
+        return ORJSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={
+                "status": "accepted",
+                "message": "File uploaded; ingestion running in the background",
                 "file_id": file_id,
                 "trace_id": trace_id
             }
-        except HTTPException:
-            raise  
-        except Exception as e:
-            logger.error(f"Error during file processing {trace_id}: {str(e)}", exc_info=True)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to process file: {str(e)}"
-            )
+        )
     except HTTPException:
         raise  
     except Exception as e:
@@ -232,6 +417,41 @@ async def upload_file(file: UploadFile = File(...)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
         )
+ingestion_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+INGESTION_JOBS_MAX = 1000
+def _record_job(trace_id: str, **fields) -> None:
+    """Update a job record, re-inserting it if the LRU bound evicted it."""
+    job = ingestion_jobs.setdefault(trace_id, {})
+    job.update(fields)
+    while len(ingestion_jobs) > INGESTION_JOBS_MAX:
+        ingestion_jobs.popitem(last=False)
+async def _process_ingestion(trace_id: str, message: Message) -> None:
+    """Run an ingestion request in the background and record its outcome."""
+    try:
+        response = await mcp_server_global.route_message(message)
+        if not response or response.message_type == MessageType.ERROR:
+            error_msg = response.payload.get("error", "Error processing file") if response else "No response from ingestion agent"
+            logger.error(f"Error processing file upload {trace_id}: {error_msg}")
+            _record_job(trace_id, status="error", error=error_msg)
+            return
+        _record_job(
+            trace_id,
+            status="success",
+            processed_count=response.payload.get("processed_count"),
+            error_count=response.payload.get("error_count")
+        )
+        # stale answers must not mask the freshly ingested content
+        semantic_cache.clear()
+    except Exception as e:
+        logger.error(f"Error during file processing {trace_id}: {str(e)}", exc_info=True)
+        _record_job(trace_id, status="error", error=str(e))
+@app.get("/api/upload/status/{trace_id}")
+async def upload_status(trace_id: str):
+    """Report the state of a background ingestion job."""
+    job = ingestion_jobs.get(trace_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job: {trace_id}")
+    return {"trace_id": trace_id, **job}
 @app.get("/health")
 async def health_check():
     """
@@ -239,7 +459,7 @@ async def health_check():
     Returns:
         JSON response with service status
     """
-    trace_id = str(uuid.uuid4())
+    trace_id = uuid4_hex()
     health_status = {
         "status": "ok",
         "services": {},
@@ -248,7 +468,7 @@ async def health_check():
         "timestamp": datetime.datetime.utcnow().isoformat()
     }
     try:
-        doc_count = vector_store.get_document_count()
+        doc_count = await vector_store.get_document_count()
         health_status["services"]["vector_store"] = {
             "status": "ok",
             "document_count": doc_count
@@ -260,10 +480,11 @@ async def health_check():
         }
         health_status["status"] = "degraded"
     try:
-        test_embedding = embedding_service.embed_text("health check")
+        test_embedding = await asyncio.to_thread(embedding_service.embed_text, "health check")
         health_status["services"]["embedding_service"] = {
             "status": "ok",
-            "embedding_dimensions": len(test_embedding) if test_embedding else 0
+            "embedding_dimensions": len(test_embedding) if test_embedding is not None else 0,
+            "cache_hit_rate": embedding_service.hit_rate
         }
     except Exception as e:
         health_status["services"]["embedding_service"] = {
@@ -272,26 +493,39 @@ async def health_check():
         }
         health_status["status"] = "degraded"
     health_status["agents"] = {}
-    for agent_id in ["ingestion_agent", "retrieval_agent", "response_agent", "coordinator_agent"]:
+    agent_ids = ["ingestion_agent", "retrieval_agent", "response_agent", "coordinator_agent"]
+    async def ping_agent(agent_id: str) -> float:
+        start = time.perf_counter()
+        # pings are consumed synchronously and retained by nothing, so the
+        # shells can go back to the Message free-list after routing
+        ping = Message.acquire(
+            message_type=MessageType.SYSTEM_HEALTH_CHECK,
+            sender="api",
+            receiver=agent_id,
+            trace_id=trace_id,
+            payload={"action": "ping", "trace_id": trace_id}
+        )
         try:
-            response = await coordinator.send_message(
-                receiver_id=agent_id,
-                message_type=MessageType.LLM_REQUEST,
-                payload={
-                    "action": "ping",
-                    "trace_id": trace_id
-                }
-            )
-            health_status["agents"][agent_id] = {
-                "status": "ok",
-                "response_time": response.get("metadata", {}).get("response_time", 0) if response else 0
-            }
-        except Exception as e:
+            await mcp_server_global.route_message(ping)
+        finally:
+            Message.release(ping)
+        return time.perf_counter() - start
+    ping_results = await asyncio.gather(
+        *(ping_agent(agent_id) for agent_id in agent_ids),
+        return_exceptions=True
+    )
+    for agent_id, result in zip(agent_ids, ping_results):
+        if isinstance(result, BaseException):
             health_status["agents"][agent_id] = {
                 "status": "error",
-                "error": str(e)
+                "error": str(result)
             }
             health_status["status"] = "degraded"
+        else:
+            health_status["agents"][agent_id] = {
+                "status": "ok",
+                "response_time": result
+            }
     status_code = 200 if health_status["status"] == "ok" else 503
     return JSONResponse(
         content=health_status,
@@ -300,12 +534,13 @@ async def health_check():
 @app.post("/api/clear", response_model=dict)
 async def clear_knowledge_base():
     """Clear the knowledge base."""
-    trace_id = str(uuid.uuid4())
+    trace_id = uuid4_hex()
     logger.info(f"Clearing knowledge base, trace_id: {trace_id}")
     try:
-        vector_store.clear()
+        await vector_store.clear()
+        semantic_cache.clear()
         try:
-            await coordinator.send_message(
+            await coordinator_global.send_message(
                 receiver_id="ingestion_agent",
                 message_type=MessageType.INGESTION_REQUEST,
                 payload={
@@ -327,33 +562,6 @@ async def clear_knowledge_base():
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=error_msg
         )
-@app.get("/", response_class=HTMLResponse)
-async def get_index():
-    """Serve the main chat interface."""
-    with open("templates/index.html", "r", encoding="utf-8") as f:
-        return f.read()
-@app.get("/health", status_code=status.HTTP_200_OK)
-async def health_check():
-    """
-    Health check endpoint
-    Returns:
-        JSON response with service status
-    """
-    try:
-        return {
-            "status": "healthy",
-            "version": "0.1.0",
-            "services": {
-                "database": "ok",  
-                "models": "ok"     
-            }
-        }
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Service is not healthy"
-        )
 if __name__ == "__main__":
     (Path(__file__).parent / "templates").mkdir(exist_ok=True)
     if not (Path(__file__).parent / "templates" / "index.html").exists():
@@ -510,4 +718,16 @@ if __name__ == "__main__":
             </body>
             </html>
             """)
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # WEB_CONCURRENCY > 1 shards the in-memory state (vector store, caches,
+    # conversation history, ingestion jobs) per worker: a document ingested by
+    # one worker is invisible to chats served by another. Scale out only with
+    # shared storage behind those pieces.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="uvloop" if uvloop is not None else "auto",
+        http="httptools",
+        access_log=False
+    )
\ No newline at end of file
@@ -0,0 +1,82 @@
+import hashlib
+import logging
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Union
+import numpy as np
+class EmbeddingCache:
+    """
+    Persistent cache of chunk embeddings keyed by content hash.
+    Keys combine the embedding model id with a blake2b digest of the chunk
+    text, so unchanged chunks skip embedding inference on re-ingestion while
+    a model swap invalidates every entry naturally.
+    """
+    def __init__(self, db_path: Union[str, Path], model: str):
+        """
+        Initialize the embedding cache.
+        Args:
+            db_path: Path to the SQLite database file backing the cache.
+            model: Identifier of the embedding model producing the vectors.
+        """
+        self.model = model
+        self.logger = logging.getLogger(__name__)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "hash BLOB PRIMARY KEY, model TEXT, vector BLOB, dtype TEXT DEFAULT 'float32')"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if 'dtype' not in columns:
+            # pre-quantization cache layout; drop and let it refill
+            self._conn.execute("DROP TABLE embeddings")
+            self._conn.execute(
+                "CREATE TABLE embeddings ("
+                "hash BLOB PRIMARY KEY, model TEXT, vector BLOB, dtype TEXT DEFAULT 'float32')"
+            )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+    def _key(self, text: str) -> bytes:
+        """Compute the cache key for a chunk of text."""
+        return hashlib.blake2b(
+            f"{self.model}\x00{text}".encode("utf-8"), digest_size=16
+        ).digest()
+    def get(self, text: str) -> Optional[List[float]]:
+        """
+        Look up the cached embedding for a chunk of text.
+        Args:
+            text: The chunk text to look up.
+        Returns:
+            The cached vector, or None on a cache miss.
+        """
+        row = self._conn.execute(
+            "SELECT vector, dtype FROM embeddings WHERE hash = ?", (self._key(text),)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return np.frombuffer(row[0], dtype=np.dtype(row[1])).astype(np.float32).tolist()
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """
+        Store embeddings for a batch of chunks.
+        Args:
+            texts: The chunk texts.
+            vectors: The corresponding embedding vectors.
+        """
+        rows = [
+            (self._key(text), self.model, np.asarray(vector, dtype=np.float16).tobytes(), 'float16')
+            for text, vector in zip(texts, vectors)
+        ]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (hash, model, vector, dtype) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        self._conn.commit()
+    def hit_rate(self) -> float:
+        """Return the fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self._conn.close()
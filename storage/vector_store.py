@@ -1,33 +1,83 @@
 from typing import List, Dict, Any, Optional
+import asyncio
+from collections import defaultdict
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import logging
 import os
+import torch
+try:
+    import faiss
+except ImportError:
+    faiss = None
 class VectorStore:
     """
     A vector store implementation using sentence-transformers for embeddings.
     This provides better semantic search capabilities than the dummy implementation.
+    Stored vectors are L2-normalized at insert, so cosine similarity reduces
+    to a plain dot product at query time.
     """
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    ENCODE_BATCH_SIZE = 64
+    ENCODE_MICRO_BATCH = 32
+    ENCODE_MICRO_WAIT = 0.005
+    SQ_TRAIN_SIZE = 256
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', quantize: bool = False):
         """
         Initialize the vector store with a sentence-transformers model.
         Args:
             model_name: Name of the sentence-transformers model to use for embeddings.
                        Default is 'all-MiniLM-L6-v2' which is a good general-purpose model.
+            quantize: Store index vectors as int8 scalar-quantized codes; the
+                      index is trained once SQ_TRAIN_SIZE vectors accumulate.
         """
-        self.vectors = {}
+        self.quantize = quantize
+        self._matrix = None
+        self._size = 0
+        self._ids = []
+        self._id_to_row = {}
+        self._index = None
+        self._id_to_int = {}
+        self._int_to_id = {}
+        self._next_int_id = 0
+        self._encode_queue = None
+        self._encode_task = None
+        self._inverted = defaultdict(lambda: defaultdict(set))
+        self._unindexed_keys = set()
         self.metadata = {}
+        self.texts = {}
+        self.model_name = model_name
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
         self.logger.info(f"Loading sentence-transformers model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.model = SentenceTransformer(model_name, device=self.device)
+        if self.device == 'cuda':
+            self.model = self.model.half()
+            self.ENCODE_BATCH_SIZE = 64
+        else:
+            self.ENCODE_BATCH_SIZE = 8
         self.embedding_dim = self.model.get_sentence_embedding_dimension()
-        self.logger.info(f"Model loaded with embedding dimension: {self.embedding_dim}")
+        self.logger.info(f"Model loaded on {self.device} with embedding dimension: {self.embedding_dim}")
+    INITIAL_CAPACITY = 1024
+    def _ensure_capacity(self, additional: int, dim: int) -> None:
+        """Grow the vector matrix geometrically to fit additional rows."""
+        if self._matrix is None:
+            capacity = max(self.INITIAL_CAPACITY, additional)
+            self._matrix = np.empty((capacity, dim), dtype=np.float32)
+            return
+        needed = self._size + additional
+        if needed <= self._matrix.shape[0]:
+            return
+        capacity = max(2 * self._matrix.shape[0], needed)
+        grown = np.empty((capacity, self._matrix.shape[1]), dtype=np.float32)
+        grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
     async def add_vectors(
-        self, 
-        vectors: List[List[float]], 
+        self,
+        vectors: List[List[float]],
         metadatas: List[Dict[str, Any]],
-        ids: Optional[List[str]] = None
+        ids: Optional[List[str]] = None,
+        texts: Optional[List[str]] = None
     ) -> List[str]:
         """
         Add vectors to the store with associated metadata.
@@ -35,21 +85,68 @@ class VectorStore:
             vectors: List of vector embeddings to add
             metadatas: List of metadata dictionaries corresponding to each vector
             ids: Optional list of IDs for each vector. If not provided, will generate UUIDs.
+            texts: Optional original chunk texts, kept for retrieval results
         Returns:
             List of IDs for the added vectors
         """
         if ids is None:
             import uuid
             ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
-        for vec_id, vector, metadata in zip(ids, vectors, metadatas):
-            self.vectors[vec_id] = np.array(vector, dtype=np.float32)
+        if not ids:
+            return ids
+        rows = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        rows = rows / (np.linalg.norm(rows, axis=1, keepdims=True) + 1e-10)
+        self._ensure_capacity(len(ids), rows.shape[1])
+        self._matrix[self._size:self._size + len(ids)] = rows
+        for vec_id in ids:
+            self._id_to_row[vec_id] = self._size
+            self._ids.append(vec_id)
+            self._size += 1
+        if faiss is not None:
+            if self._index is None and getattr(self, 'quantize', False):
+                if self._size >= self.SQ_TRAIN_SIZE:
+                    self._build_quantized_index()
+            else:
+                if self._index is None:
+                    self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(rows.shape[1]))
+                int_ids = np.arange(self._next_int_id, self._next_int_id + len(ids), dtype=np.int64)
+                self._index.add_with_ids(np.ascontiguousarray(rows), int_ids)
+                for int_id, vec_id in zip(int_ids, ids):
+                    self._int_to_id[int(int_id)] = vec_id
+                    self._id_to_int[vec_id] = int(int_id)
+                self._next_int_id += len(ids)
+        for vec_id, metadata in zip(ids, metadatas):
             self.metadata[vec_id] = metadata
+            for key, value in metadata.items():
+                try:
+                    self._inverted[key][value].add(vec_id)
+                except TypeError:
+                    self._unindexed_keys.add(key)
+        if texts is not None:
+            for vec_id, text in zip(ids, texts):
+                self.texts[vec_id] = text
         return ids
+    def _build_quantized_index(self) -> None:
+        """Train an int8 scalar-quantized index on the accumulated vectors."""
+        dim = self._matrix.shape[1]
+        index = faiss.IndexIDMap2(faiss.IndexScalarQuantizer(
+            dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        ))
+        train_vectors = np.ascontiguousarray(self._matrix[:self._size])
+        index.train(train_vectors)
+        int_ids = np.arange(self._next_int_id, self._next_int_id + self._size, dtype=np.int64)
+        index.add_with_ids(train_vectors, int_ids)
+        for int_id, vec_id in zip(int_ids, self._ids):
+            self._int_to_id[int(int_id)] = vec_id
+            self._id_to_int[vec_id] = int(int_id)
+        self._next_int_id += self._size
+        self._index = index
     async def similarity_search(
-        self, 
-        query_text: str, 
+        self,
+        query_text: str,
         k: int = 5,
-        filter_condition: Optional[Dict[str, Any]] = None
+        filter_condition: Optional[Dict[str, Any]] = None,
+        candidate_ids: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Find the k most similar documents to the query text.
@@ -57,47 +154,184 @@ class VectorStore:
             query_text: The query text to search for
             k: Number of results to return
             filter_condition: Optional filter to apply to metadata
+            candidate_ids: Optional pre-narrowed ids; only these are scored
         Returns:
             List of dictionaries containing 'id', 'text', 'metadata', and 'similarity' score
         Raises:
             ValueError: If no query text is provided
         """
+        if not query_text or not query_text.strip():
+            raise ValueError("Query text cannot be empty")
+        query_embedding = await self._encode_query_batched(query_text)
+        return await asyncio.to_thread(self._scan, query_embedding, k, filter_condition, candidate_ids)
+    async def _encode_query_batched(self, query_text: str):
+        """
+        Encode a query through the micro-batching queue.
+        Concurrent queries landing within ENCODE_MICRO_WAIT are coalesced into
+        one model.encode forward pass of up to ENCODE_MICRO_BATCH texts.
+        """
+        if self._encode_queue is None:
+            self._encode_queue = asyncio.Queue()
+        if self._encode_task is None or self._encode_task.done():
+            self._encode_task = asyncio.ensure_future(self._drain_encode_queue())
+        future = asyncio.get_running_loop().create_future()
+        self._encode_queue.put_nowait((query_text, future))
+        return await future
+    async def _drain_encode_queue(self) -> None:
+        """Collect queued query texts and encode them in batches."""
+        while True:
+            batch = [await self._encode_queue.get()]
+            while len(batch) < self.ENCODE_MICRO_BATCH:
+                try:
+                    batch.append(await asyncio.wait_for(
+                        self._encode_queue.get(), self.ENCODE_MICRO_WAIT
+                    ))
+                except asyncio.TimeoutError:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await asyncio.to_thread(self._encode, texts, self.ENCODE_MICRO_BATCH)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+    def search_sync(
+        self,
+        query_text: str,
+        k: int = 5,
+        filter_condition: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Synchronous core of similarity_search, for callers offloading the
+        encode + scan to their own executor.
+        Args:
+            query_text: The query text to search for
+            k: Number of results to return
+            filter_condition: Optional filter to apply to metadata
+        Returns:
+            List of result dictionaries as in similarity_search
+        """
         if not query_text or not query_text.strip():
             raise ValueError("Query text cannot be empty")
         try:
-            query_embedding = self.model.encode(
-                query_text,
-                convert_to_numpy=True,
-                show_progress_bar=False,
-                normalize_embeddings=True
-            )
-            query_vector = query_embedding.tolist()
+            query_embedding = self._encode(query_text, 1)
         except Exception as e:
             self.logger.error(f"Error generating query embedding: {str(e)}", exc_info=True)
             raise
-        if not self.vectors:
+        return self._scan(query_embedding, k, filter_condition)
+    def _scan(
+        self,
+        query_vector,
+        k: int,
+        filter_condition: Optional[Dict[str, Any]] = None,
+        candidate_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Rank stored vectors against an already-computed query embedding."""
+        if not self._size:
             return []
-        query_vec = np.array(query_vector, dtype=np.float32)
-        results = []
-        for vec_id, vector in self.vectors.items():
-            metadata = self.metadata[vec_id]
+        query_vec = np.asarray(query_vector, dtype=np.float32)
+        query_vec = query_vec / (np.linalg.norm(query_vec) + 1e-10)
+        if candidate_ids is not None:
+            rows = np.fromiter(
+                (self._id_to_row[vec_id] for vec_id in candidate_ids if vec_id in self._id_to_row),
+                dtype=np.int64
+            )
             if filter_condition:
-                if not all(
-                    metadata.get(k) == v 
-                    for k, v in filter_condition.items()
-                ):
-                    continue
-            similarity = np.dot(query_vec, vector) / (
-                np.linalg.norm(query_vec) * np.linalg.norm(vector) + 1e-10
+                rows = np.fromiter(
+                    (
+                        row for row in rows
+                        if all(
+                            self.metadata[self._ids[row]].get(key) == value
+                            for key, value in filter_condition.items()
+                        )
+                    ),
+                    dtype=np.int64
+                )
+            if not len(rows):
+                return []
+            return self._top_k(self._matrix[rows] @ query_vec, rows, k)
+        if self._index is not None and not filter_condition:
+            k_eff = min(k, self._size)
+            similarities, int_ids = self._index.search(
+                np.ascontiguousarray(query_vec)[None, :], k_eff
             )
+            return [
+                {
+                    'id': (vec_id := self._int_to_id[int(int_id)]),
+                    'text': self.texts.get(vec_id, ''),
+                    'metadata': self.metadata[vec_id],
+                    'score': float(similarity),
+                    'similarity': float(similarity)
+                }
+                for int_id, similarity in zip(int_ids[0], similarities[0])
+                if int_id >= 0
+            ]
+        if filter_condition:
+            candidate_ids = self._filter_candidates(filter_condition)
+            if candidate_ids is not None:
+                rows = np.fromiter(
+                    (self._id_to_row[vec_id] for vec_id in candidate_ids),
+                    dtype=np.int64, count=len(candidate_ids)
+                )
+            else:
+                rows = np.fromiter(
+                    (
+                        row for row, vec_id in enumerate(self._ids)
+                        if all(
+                            self.metadata[vec_id].get(key) == value
+                            for key, value in filter_condition.items()
+                        )
+                    ),
+                    dtype=np.int64
+                )
+            if not len(rows):
+                return []
+            similarities = self._matrix[rows] @ query_vec
+        else:
+            rows = None
+            similarities = self._matrix[:self._size] @ query_vec
+        return self._top_k(similarities, rows, k)
+    def _top_k(self, similarities, rows, k: int) -> List[Dict[str, Any]]:
+        """Select the k best rows with argpartition and build their results."""
+        k_eff = min(k, len(similarities))
+        if k_eff <= 0:
+            return []
+        top = np.argpartition(-similarities, k_eff - 1)[:k_eff]
+        top = top[np.argsort(-similarities[top])]
+        results = []
+        for position in top:
+            row = int(rows[position]) if rows is not None else int(position)
+            vec_id = self._ids[row]
+            similarity = float(similarities[position])
             results.append({
                 'id': vec_id,
-                'vector': vector,
-                'metadata': metadata,
-                'similarity': float(similarity)
+                'text': self.texts.get(vec_id, ''),
+                'metadata': self.metadata[vec_id],
+                'score': similarity,
+                'similarity': similarity
             })
-        results.sort(key=lambda x: x['similarity'], reverse=True)
-        return results[:k]
+        return results
+    def _filter_candidates(self, filter_condition: Dict[str, Any]):
+        """
+        Resolve a metadata filter to candidate vector ids via the inverted
+        index, or None when a key cannot be answered from the index.
+        """
+        candidates = None
+        for key, value in filter_condition.items():
+            if key in self._unindexed_keys:
+                return None
+            try:
+                bucket = self._inverted[key][value] if key in self._inverted else set()
+            except TypeError:
+                return None
+            candidates = set(bucket) if candidates is None else candidates & bucket
+            if not candidates:
+                return candidates
+        return candidates
     async def delete_vectors(self, ids: List[str]) -> bool:
         """
         Delete vectors by their IDs.
@@ -108,11 +342,30 @@ class VectorStore:
         """
         success = True
         for vec_id in ids:
-            try:
-                del self.vectors[vec_id]
-                del self.metadata[vec_id]
-            except KeyError:
+            row = self._id_to_row.pop(vec_id, None)
+            if row is None or vec_id not in self.metadata:
                 success = False
+                continue
+            for key, value in self.metadata[vec_id].items():
+                try:
+                    self._inverted[key][value].discard(vec_id)
+                except TypeError:
+                    pass
+            last_row = self._size - 1
+            last_id = self._ids[last_row]
+            if row != last_row:
+                self._matrix[row] = self._matrix[last_row]
+                self._ids[row] = last_id
+                self._id_to_row[last_id] = row
+            self._ids.pop()
+            self._size = last_row
+            del self.metadata[vec_id]
+            self.texts.pop(vec_id, None)
+            int_id = self._id_to_int.pop(vec_id, None)
+            if int_id is not None:
+                self._int_to_id.pop(int_id, None)
+                if self._index is not None:
+                    self._index.remove_ids(np.asarray([int_id], dtype=np.int64))
         return success
     async def clear(self) -> None:
         """
@@ -120,15 +373,60 @@ class VectorStore:
         Returns:
             None
         """
-        self.vectors.clear()
+        self._matrix = None
+        self._size = 0
+        self._ids = []
+        self._id_to_row = {}
+        self._index = None
+        self._id_to_int = {}
+        self._int_to_id = {}
+        self._next_int_id = 0
+        self._inverted = defaultdict(lambda: defaultdict(set))
+        self._unindexed_keys = set()
         self.metadata.clear()
+        self.texts.clear()
     async def get_document_count(self) -> int:
         """
         Get the total number of documents in the vector store.
         Returns:
             int: Number of documents in the store
         """
-        return len(self.vectors)
+        return self._size
+    def _encode(self, texts, batch_size: int):
+        """Run the encoder under inference_mode with the tuned batch size."""
+        with torch.inference_mode():
+            return self.model.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                normalize_embeddings=True
+            )
+    async def embed_texts(self, texts: List[str]) -> "np.ndarray":
+        """
+        Generate embeddings for a batch of texts.
+        Args:
+            texts: The texts to embed.
+        Returns:
+            Array of embedding vectors, one row per input text.
+        """
+        return await asyncio.to_thread(self._encode, texts, self.ENCODE_BATCH_SIZE)
+    async def add_documents_with_vectors(
+        self,
+        documents: List[Dict[str, Any]],
+        vectors: List[List[float]]
+    ) -> List[str]:
+        """
+        Add documents whose embeddings were already computed (e.g. cached).
+        Args:
+            documents: List of documents, each a dict with 'text' and 'metadata'
+            vectors: Precomputed embedding vectors matching the documents
+        Returns:
+            List of document IDs
+        """
+        metadatas = [doc.get('metadata', {}) for doc in documents]
+        texts = [doc.get('text', '') for doc in documents]
+        return await self.add_vectors(vectors, metadatas, texts=texts)
     async def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
         """
         Add documents to the vector store with automatic embedding generation.
@@ -156,14 +454,8 @@ class VectorStore:
             return []
         try:
             self.logger.info(f"Generating embeddings for {len(texts)} text chunks")
-            vectors = self.model.encode(
-                texts,
-                convert_to_numpy=True,
-                show_progress_bar=True,
-                normalize_embeddings=True
-            )
-            vectors = [vector.tolist() for vector in vectors]
-            return await self.add_vectors(vectors, metadatas)
+            vectors = await asyncio.to_thread(self._encode, texts, self.ENCODE_BATCH_SIZE)
+            return await self.add_vectors(vectors, metadatas, texts=texts)
         except Exception as e:
             self.logger.error(f"Error generating embeddings: {str(e)}", exc_info=True)
             raise
\ No newline at end of file